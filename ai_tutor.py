@@ -4,13 +4,20 @@ Supports OpenAI GPT and Ollama
 """
 import json
 import logging
+import os
+import re
+import string
+import threading
 import time
-from typing import List, Dict, Optional, Generator
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from random import choice
+from typing import List, Dict, Optional, Generator, Iterable, Tuple, Callable, Hashable
 from datetime import datetime
-from pathlib import Path
 
 try:
     import openai
+    import httpx
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
@@ -18,74 +25,199 @@ except ImportError:
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
     REQUESTS_AVAILABLE = True
 except ImportError:
     REQUESTS_AVAILABLE = False
     print("Requests library not available")
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Interest keywords, matched against whole words of user messages
+INTEREST_KEYWORDS = {
+    interest: frozenset(keywords)
+    for interest, keywords in {
+        'cooking': ['cook', 'cooking', 'cooked', 'recipe', 'recipes', 'food', 'kitchen', 'meal', 'meals'],
+        'travel': ['travel', 'travels', 'traveling', 'travelling', 'trip', 'trips', 'vacation',
+                   'country', 'countries', 'visit', 'visited', 'visiting'],
+        'sports': ['sport', 'sports', 'exercise', 'gym', 'football', 'soccer', 'basketball'],
+        'music': ['music', 'song', 'songs', 'band', 'bands', 'concert', 'concerts', 'guitar', 'piano'],
+        'work': ['work', 'working', 'job', 'jobs', 'career', 'office', 'colleague', 'colleagues', 'boss'],
+        'family': ['family', 'parents', 'siblings', 'children', 'kids'],
+        'movies': ['movie', 'movies', 'film', 'films', 'cinema', 'actor', 'actors', 'director'],
+        'books': ['book', 'books', 'read', 'reading', 'novel', 'novels', 'author', 'library'],
+        'technology': ['computer', 'computers', 'phone', 'phones', 'app', 'apps', 'internet', 'software']
+    }.items()
+}
+
+# Sentiment words, matched against whole words of user messages
+POSITIVE_WORDS = frozenset(['happy', 'great', 'good', 'love', 'amazing', 'wonderful', 'excited'])
+NEGATIVE_WORDS = frozenset(['sad', 'bad', 'terrible', 'hate', 'awful', 'disappointed', 'worried'])
+
+# Words that flip a statement's meaning; "don't" splits into "don" and "t"
+NEGATION_WORDS = frozenset(['not', 'no', 'never', 'nothing', 'nobody', 'none', 'neither', 'nor',
+                            'cannot', 't', 'don', 'doesn', 'didn', 'isn', 'aren', 'wasn', 'weren',
+                            'won', 'wouldn', 'shouldn', 'couldn', 'haven', 'hasn', 'hadn'])
+
+_WORD_RE = re.compile(r"[a-z]+")
+_QUESTION_RE = re.compile(r"[^?]+\?")
+_TOPIC_RE = re.compile(r"[a-z]{5,}")
+_PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
+# int.bit_count() is only available on Python 3.10+
+_popcount = getattr(int, 'bit_count', lambda bits: bin(bits).count('1'))
+
+# Fallback responses used when the AI provider fails
+_INTEREST_FALLBACKS = {
+    'cooking': "Speaking of cooking, have you discovered any interesting flavor combinations lately?",
+    'travel': "Your travel experiences sound fascinating! What's been your most memorable journey so far?",
+    'music': "I'm curious about your music taste. What genre speaks to your soul?"
+}
+
+_NEUTRAL_FALLBACKS = (
+    "That's fascinating! What's the story behind that?",
+    "I'm intrigued - what's your perspective on this?",
+    "That's an interesting angle. What led you to that conclusion?",
+    "Tell me more about that - I'm genuinely curious."
+)
+
+_SENTIMENT_FALLBACKS = {
+    'positive': (
+        "Your enthusiasm is contagious! What else brings you joy?",
+        "That sounds wonderful! I'd love to hear more about what makes it special.",
+        "You seem really passionate about this - what got you interested in it?"
+    ),
+    'negative': (
+        "That sounds challenging. How are you dealing with it?",
+        "I can understand why that would be frustrating. What helps you cope?",
+        "That must be tough. Is there anything positive you can take from the experience?"
+    ),
+    'neutral': _NEUTRAL_FALLBACKS
+}
+
+_CREATIVE_FALLBACKS = (
+    "That sparks my curiosity! What's the most surprising thing about that?",
+    "Fascinating perspective! How did you come to that realization?",
+    "That's genuinely intriguing - what's the story behind it?",
+    "I'm drawn to that topic. What aspect excites you most?",
+    "Your experience sounds unique. What made it stand out?",
+    "That's thought-provoking. What unexpected lessons did you learn?"
+)
+
+class Message:
+    """A single conversation message"""
+    
+    __slots__ = ('role', 'content', 'lowered', 'created_at')
+    
+    def __init__(self, role: str, content: str, created_at: Optional[float] = None):
+        self.role = role
+        self.content = content
+        self.lowered = content.lower()  # Shared by the text extractors
+        self.created_at = time.time() if created_at is None else created_at  # Epoch seconds
+    
+    def __getitem__(self, key: str):
+        """Support dict-style access used by existing callers"""
+        if key == "timestamp":
+            return self.timestamp
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    @property
+    def timestamp(self) -> str:
+        """ISO formatted creation time"""
+        return datetime.fromtimestamp(self.created_at).isoformat()
+    
+    def to_dict(self) -> Dict[str, str]:
+        """Convert to the saved conversation format"""
+        return {"role": self.role, "content": self.content, "timestamp": self.timestamp}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, str]) -> "Message":
+        """Create a message from the saved conversation format"""
+        created_at = None
+        if "timestamp" in data:
+            created_at = datetime.fromisoformat(data["timestamp"]).timestamp()
+        return cls(data["role"], data["content"], created_at)
+
 class ConversationHistory:
     """Manage conversation history with advanced tracking"""
     
+    # The vocabulary is rebuilt from the tracked entries once it outgrows their words this
+    # many times over, but never below MIN_VOCAB_CAP, so bitsets stay narrow in long sessions
+    VOCAB_GROWTH = 4
+    MIN_VOCAB_CAP = 256
+    
     def __init__(self):
-        self.messages: List[Dict[str, str]] = []
+        self.messages: List[Message] = []
         self.session_start = datetime.now()
         self.total_tokens = 0
+        self.cached_tokens = 0  # Prompt tokens the provider served from its prompt cache
+        self.user_count = 0  # Number of user messages
+        self.ai_count = 0    # Number of assistant messages
         self.conversation_id = None
         self.user_interests = set()  # Track user interests/topics
-        self.recent_questions = []   # Track recent AI questions to avoid repetition
+        self.recent_questions = deque(maxlen=10)  # Track recent AI questions to avoid repetition
+        self._question_union = 0  # Union of the recent question bitsets
+        self.recent_responses = deque(maxlen=3)   # Track recent AI responses with cached bitsets
+        self.recent_messages = deque(maxlen=6)    # Last 3 exchanges for topic and guidance tracking
         self.conversation_topics = []  # Track conversation topics
         self.last_user_sentiment = "neutral"  # Track user sentiment
+        self._vocab: Dict[str, int] = {}  # Word -> bit position for question bitsets
+        self._api_messages: List[Dict[str, str]] = []  # API-ready copy of messages
+        self._personalization_context = ""
+        self._personalization_dirty = True  # Set whenever the tracked state may change
+        self.lock = threading.RLock()  # Held while the history is read for a prompt or changed
     
     def add_message(self, role: str, content: str):
         """Add a message to the conversation with advanced tracking"""
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat()
-        }
+        message = Message(role, content)
         self.messages.append(message)
+        self.recent_messages.append(message)
+        self._personalization_dirty = True
+        self._api_messages.append({"role": role, "content": content})
         
         # Track conversation elements
         if role == "user":
-            self._extract_user_interests(content)
-            self._detect_sentiment(content)
+            self.user_count += 1
+            tokens = _WORD_RE.findall(message.lowered)
+            self._extract_user_interests(tokens)
+            self._detect_sentiment(tokens)
         elif role == "assistant":
-            self._track_ai_questions(content)
+            self.ai_count += 1
+            self._track_ai_questions(message.lowered)
+            self._track_ai_response(message.lowered)
+            self._compact_vocab()
             
         logger.info(f"Added {role} message: {content[:50]}...")
     
-    def _extract_user_interests(self, content: str):
-        """Extract and track user interests from their messages"""
-        # Simple keyword extraction for interests
-        interest_keywords = {
-            'cooking': ['cook', 'recipe', 'food', 'kitchen', 'meal'],
-            'travel': ['travel', 'trip', 'vacation', 'country', 'visit'],
-            'sports': ['sport', 'exercise', 'gym', 'football', 'soccer', 'basketball'],
-            'music': ['music', 'song', 'band', 'concert', 'guitar', 'piano'],
-            'work': ['work', 'job', 'career', 'office', 'colleague', 'boss'],
-            'family': ['family', 'parents', 'siblings', 'children', 'kids'],
-            'movies': ['movie', 'film', 'cinema', 'actor', 'director'],
-            'books': ['book', 'read', 'novel', 'author', 'library'],
-            'technology': ['computer', 'phone', 'app', 'internet', 'software']
-        }
-        
-        content_lower = content.lower()
-        for interest, keywords in interest_keywords.items():
-            if any(keyword in content_lower for keyword in keywords):
+    def add_exchange(self, user_input: str, response: str):
+        """Add a user message and the tutor's reply to it as one step"""
+        with self.lock:
+            self.add_message("user", user_input)
+            self.add_message("assistant", response)
+    
+    def _extract_user_interests(self, tokens: List[str]):
+        """Extract and track user interests from their message words"""
+        token_set = set(tokens)
+        for interest, keywords in INTEREST_KEYWORDS.items():
+            if keywords & token_set:
                 self.user_interests.add(interest)
     
-    def _detect_sentiment(self, content: str):
+    def _detect_sentiment(self, tokens: List[str]):
         """Simple sentiment detection"""
-        positive_words = ['happy', 'great', 'good', 'love', 'amazing', 'wonderful', 'excited']
-        negative_words = ['sad', 'bad', 'terrible', 'hate', 'awful', 'disappointed', 'worried']
-        
-        content_lower = content.lower()
-        positive_count = sum(1 for word in positive_words if word in content_lower)
-        negative_count = sum(1 for word in negative_words if word in content_lower)
+        positive_count = sum(1 for token in tokens if token in POSITIVE_WORDS)
+        negative_count = sum(1 for token in tokens if token in NEGATIVE_WORDS)
         
         if positive_count > negative_count:
             self.last_user_sentiment = "positive"
@@ -94,46 +226,122 @@ class ConversationHistory:
         else:
             self.last_user_sentiment = "neutral"
     
-    def _track_ai_questions(self, content: str):
+    def _track_ai_questions(self, lowered: str):
         """Track AI questions to prevent repetition"""
-        if '?' in content:
-            # Extract the main question
-            questions = [q.strip() + '?' for q in content.split('?') if q.strip()]
-            for question in questions:
-                self.recent_questions.append({
-                    'question': question.lower(),
-                    'timestamp': datetime.now()
-                })
-        
-        # Keep only recent questions (last 10)
-        self.recent_questions = self.recent_questions[-10:]
+        questions = self._extract_questions(lowered)
+        for question in questions:
+            words = frozenset(question.split())
+            bits = self._encode_words(words)
+            self.recent_questions.append({
+                'question': question,
+                'words': words,
+                'bits': bits,
+                'size': _popcount(bits),
+                'timestamp': datetime.now()
+            })
+        
+        if questions:
+            # Rebuilt rather than OR-ed in, since the deque may have evicted entries
+            self._update_question_union()
+    
+    def _update_question_union(self):
+        """Recompute the union of the recent question bitsets"""
+        union = 0
+        for recent_q in self.recent_questions:
+            union |= recent_q['bits']
+        self._question_union = union
+    
+    @staticmethod
+    def _extract_questions(lowered: str) -> List[str]:
+        """Extract the questions from a lowercased message"""
+        questions = []
+        for match in _QUESTION_RE.findall(lowered):
+            question = match.strip()
+            if question != '?':
+                questions.append(question)
+        return questions
+    
+    def _track_ai_response(self, lowered: str):
+        """Cache the bitset of a lowercased AI response for repetition checks"""
+        words = frozenset(lowered.split())
+        bits = self._encode_words(words)
+        self.recent_responses.append({
+            'words': words,
+            'bits': bits,
+            'size': _popcount(bits),
+            'timestamp': datetime.now()
+        })
     
     def is_question_repetitive(self, new_question: str) -> bool:
         """Check if a question is repetitive"""
-        new_q_lower = new_question.lower()
+        new_bits, new_size = self._encode_query(new_question.lower())
         
-        # Check for exact or very similar questions
-        for recent_q in self.recent_questions:
-            similarity = self._calculate_similarity(new_q_lower, recent_q['question'])
-            if similarity > 0.7:  # 70% similarity threshold
-                return True
-        return False
+        # No single question can share more words than all of them together,
+        # and the Jaccard similarity is at most shared words / new_size
+        if _popcount(new_bits & self._question_union) <= 0.7 * new_size:
+            return False
+        
+        # Check for exact or very similar questions (70% similarity threshold)
+        return self._any_similar(new_bits, new_size, self.recent_questions, 0.7)
+    
+    def _encode_words(self, words: Iterable[str]) -> int:
+        """Encode words as a bitset over the interned vocabulary"""
+        bits = 0
+        for word in words:
+            index = self._vocab.get(word)
+            if index is None:
+                index = self._vocab[word] = len(self._vocab)
+            bits |= 1 << index
+        return bits
     
-    def _calculate_similarity(self, text1: str, text2: str) -> float:
-        """Simple similarity calculation"""
-        words1 = set(text1.split())
-        words2 = set(text2.split())
+    def _compact_vocab(self):
+        """Re-intern only the words of tracked entries once the vocabulary has outgrown them
         
-        if not words1 or not words2:
-            return 0
+        Evicted questions and responses leave their words behind, so without this the
+        vocabulary, and with it the width of every bitset, grows for the whole session.
+        """
+        entries = (*self.recent_questions, *self.recent_responses)
+        live_words = sum(len(entry['words']) for entry in entries)
+        if len(self._vocab) <= max(self.MIN_VOCAB_CAP, self.VOCAB_GROWTH * live_words):
+            return
         
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
+        self._vocab = {}
+        for entry in entries:
+            entry['bits'] = self._encode_words(entry['words'])
+        self._update_question_union()
+    
+    def _encode_query(self, text: str) -> Tuple[int, int]:
+        """Encode a text for lookups without growing the vocabulary
         
-        return len(intersection) / len(union)
+        Words that were never interned cannot match a cached entry, so they
+        only count towards the word-set size.
+        """
+        words = set(text.split())
+        bits = 0
+        for word in words:
+            index = self._vocab.get(word)
+            if index is not None:
+                bits |= 1 << index
+        return bits, len(words)
+    
+    @staticmethod
+    def _any_similar(bits: int, size: int, entries: Iterable[Dict], threshold: float) -> bool:
+        """Check if any cached bitset entry exceeds the Jaccard similarity threshold"""
+        for entry in entries:
+            # Jaccard similarity can never exceed the ratio of the set sizes
+            if min(size, entry['size']) <= threshold * max(size, entry['size']):
+                continue
+            
+            intersection = _popcount(bits & entry['bits'])
+            if intersection / (size + entry['size'] - intersection) > threshold:
+                return True
+        return False
     
     def get_personalization_context(self) -> str:
         """Get context for personalizing responses"""
+        if not self._personalization_dirty:
+            return self._personalization_context
+        
         context_parts = []
         
         if self.user_interests:
@@ -148,7 +356,9 @@ class ConversationHistory:
             topics_str = ", ".join(recent_topics)
             context_parts.append(f"Recent topics discussed: {topics_str}")
         
-        return " | ".join(context_parts)
+        self._personalization_context = " | ".join(context_parts)
+        self._personalization_dirty = False
+        return self._personalization_context
     
     def _get_recent_topics(self) -> List[str]:
         """Extract recent conversation topics"""
@@ -156,26 +366,27 @@ class ConversationHistory:
             return []
         
         # Simple topic extraction from recent messages
-        recent_messages = self.messages[-6:]  # Last 3 exchanges
         topics = []
         
-        for msg in recent_messages:
-            content = msg['content'].lower()
-            # Extract potential topics (nouns and meaningful words)
-            words = content.split()
-            meaningful_words = [w for w in words if len(w) > 4 and w.isalpha()]
-            topics.extend(meaningful_words[:2])  # Take first 2 meaningful words
+        for msg in self.recent_messages:
+            # Extract potential topics (meaningful words of 5+ letters)
+            topics.extend(_TOPIC_RE.findall(msg.lowered)[:2])  # Take first 2 meaningful words
         
-        return list(set(topics))[-5:]  # Return unique recent topics
+        return list(dict.fromkeys(topics))[-5:]  # Return unique recent topics
+    
+    @property
+    def last_response(self) -> Optional[str]:
+        """The latest tutor message, which the reply to the next user message depends on"""
+        for msg in reversed(self.recent_messages):
+            if msg.role == "assistant":
+                return msg.content
+        return None
     
     def get_messages(self, limit: Optional[int] = None) -> List[Dict[str, str]]:
         """Get recent messages for API calls"""
-        messages = [{"role": msg["role"], "content": msg["content"]} 
-                   for msg in self.messages]
-        
         if limit:
-            return messages[-limit:]
-        return messages
+            return self._api_messages[-limit:]
+        return self._api_messages[:]
     
     def save_to_file(self, filename: Optional[str] = None):
         """Save conversation to file"""
@@ -183,21 +394,25 @@ class ConversationHistory:
             timestamp = self.session_start.strftime("%Y%m%d_%H%M%S")
             filename = f"conversation_{timestamp}.json"
         
-        filepath = Config.CONVERSATIONS_DIR / filename
+        filepath = os.path.join(Config.CONVERSATIONS_DIR, filename)
         
         conversation_data = {
             "session_start": self.session_start.isoformat(),
             "session_end": datetime.now().isoformat(),
             "total_tokens": self.total_tokens,
             "message_count": len(self.messages),
-            "messages": self.messages
+            "messages": [msg.to_dict() for msg in self.messages]
         }
         
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(conversation_data, f, indent=2, ensure_ascii=False)
+            if ORJSON_AVAILABLE:
+                with open(filepath, 'wb') as f:
+                    f.write(orjson.dumps(conversation_data, option=orjson.OPT_INDENT_2))
+            else:
+                with open(filepath, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                    json.dump(conversation_data, f, indent=2, ensure_ascii=False)
             logger.info(f"Conversation saved to {filepath}")
-            return str(filepath)
+            return filepath
         except Exception as e:
             logger.error(f"Failed to save conversation: {e}")
             return None
@@ -205,10 +420,21 @@ class ConversationHistory:
     def load_from_file(self, filepath: str):
         """Load conversation from file"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(filepath, 'rb') as f:
+                data = _json_loads(f.read())
             
-            self.messages = data.get("messages", [])
+            self.messages = [Message.from_dict(msg) for msg in data.get("messages", [])]
+            self._api_messages = [{"role": msg.role, "content": msg.content}
+                                  for msg in self.messages]
+            self.recent_messages = deque(self.messages[-6:], maxlen=6)
+            self._personalization_dirty = True
+            self.user_count = sum(1 for msg in self.messages if msg.role == "user")
+            self.ai_count = sum(1 for msg in self.messages if msg.role == "assistant")
+            self.recent_responses.clear()
+            for msg in self.messages:
+                if msg.role == "assistant":
+                    self._track_ai_response(msg.lowered)
+            self._compact_vocab()
             self.total_tokens = data.get("total_tokens", 0)
             if "session_start" in data:
                 self.session_start = datetime.fromisoformat(data["session_start"])
@@ -222,22 +448,42 @@ class ConversationHistory:
     def clear(self):
         """Clear conversation history"""
         self.messages.clear()
+        self._api_messages.clear()
         self.session_start = datetime.now()
         self.total_tokens = 0
+        self.cached_tokens = 0
+        self.user_count = 0
+        self.ai_count = 0
         self.user_interests.clear()
         self.recent_questions.clear()
+        self._question_union = 0
+        self.recent_responses.clear()
+        self.recent_messages.clear()
+        self._vocab.clear()
         self.conversation_topics.clear()
         self.last_user_sentiment = "neutral"
+        self._personalization_dirty = True
         logger.info("Conversation history cleared")
 
 class OpenAITutor:
     """OpenAI GPT-based conversation tutor"""
     
+    # History sent with each request: at least HISTORY_WINDOW messages, with the start
+    # moving HISTORY_STEP messages at a time so the prompt prefix stays cacheable
+    HISTORY_WINDOW = 15
+    HISTORY_STEP = 8
+    
     def __init__(self, api_key: str):
         if not OPENAI_AVAILABLE:
             raise RuntimeError("OpenAI library not available")
         
-        self.client = openai.OpenAI(api_key=api_key)
+        # Keep the API connection alive between turns (httpx drops idle ones after 5s by default)
+        self.client = openai.OpenAI(
+            api_key=api_key,
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=16, keepalive_expiry=60)
+            )
+        )
         self.model = Config.OPENAI_MODEL
         self.system_prompt = self._get_system_prompt()
         self.conversation_history = ConversationHistory()
@@ -247,6 +493,13 @@ class OpenAITutor:
         
         logger.info(f"OpenAI tutor initialized with model: {self.model}")
     
+    def warm_up(self):
+        """Open the HTTPS connection to the API ahead of the first request"""
+        try:
+            self.client.models.retrieve(self.model)
+        except Exception as e:
+            logger.warning(f"OpenAI warm-up failed: {e}")
+    
     def _get_system_prompt(self) -> str:
         """Get the system prompt for the AI tutor"""
         return """You are a curious and engaging conversation partner who loves meeting new people and learning about their lives. 
@@ -270,30 +523,55 @@ Conversation style:
 
 Remember: You're not just a language tutor - you're a conversation partner who wants to get to know this person better through meaningful dialogue."""
     
+    def _prepare_messages(self, user_input: str) -> List[Dict[str, str]]:
+        """Build the messages for the API call from the history and the new user input"""
+        # The exchange is added to the history once the response is complete
+        with self.conversation_history.lock:
+            return self._build_messages(user_input)
+    
+    def _build_messages(self, user_input: str) -> List[Dict[str, str]]:
+        # The provider caches prompt prefixes, so the static system prompt goes first,
+        # then history in steps, and everything that changes per turn goes last
+        count = len(self.conversation_history.messages) + 1
+        limit = None
+        if count > self.HISTORY_WINDOW:
+            limit = self.HISTORY_WINDOW + (count - self.HISTORY_WINDOW) % self.HISTORY_STEP - 1
+        history = self.conversation_history.get_messages(limit=limit)
+        if history and history[0]['role'] == 'system':
+            history = history[1:]
+        messages = [{"role": "system", "content": self.system_prompt}] + history
+        messages.append({"role": "user", "content": user_input})
+        
+        # Add personalization context
+        personalization = self.conversation_history.get_personalization_context()
+        if personalization:
+            messages.append({
+                "role": "system",
+                "content": f"Personalization context: {personalization}"
+            })
+        
+        # Add conversation guidance based on recent patterns
+        guidance = self._get_conversation_guidance()
+        if guidance:
+            messages.append({
+                "role": "system", 
+                "content": f"Conversation guidance: {guidance}"
+            })
+        
+        # Forbid recently asked questions up front so fewer responses need regenerating
+        recent_questions = [q['question'] for q in self.conversation_history.recent_questions]
+        if recent_questions:
+            messages.append({
+                "role": "system",
+                "content": "Do NOT repeat any of these recent questions: " + " | ".join(recent_questions)
+            })
+        
+        return messages
+    
     def get_response(self, user_input: str) -> Optional[str]:
         """Get AI response to user input with advanced conversation logic"""
         try:
-            # Add user message to history
-            self.conversation_history.add_message("user", user_input)
-            
-            # Prepare messages for API - keep more context for better personalization
-            messages = self.conversation_history.get_messages(limit=15)
-            
-            # Add personalization context to system message
-            personalization = self.conversation_history.get_personalization_context()
-            if personalization:
-                enhanced_system_prompt = f"{self.system_prompt}\n\nPersonalization context: {personalization}"
-                # Update the system message
-                if messages and messages[0]['role'] == 'system':
-                    messages[0]['content'] = enhanced_system_prompt
-            
-            # Add conversation guidance based on recent patterns
-            guidance = self._get_conversation_guidance()
-            if guidance:
-                messages.append({
-                    "role": "system", 
-                    "content": f"Conversation guidance: {guidance}"
-                })
+            messages = self._prepare_messages(user_input)
             
             # Make API call with higher creativity settings
             response = self.client.chat.completions.create(
@@ -305,34 +583,122 @@ Remember: You're not just a language tutor - you're a conversation partner who w
                 presence_penalty=0.6   # Higher to encourage topic diversity
             )
             
+            # Update token usage
+            self._record_usage(response)
+            
             ai_response = response.choices[0].message.content.strip()
             
             # Check for repetitive questions and regenerate if needed
             if self._is_response_repetitive(ai_response):
                 logger.info("Detected repetitive response, regenerating...")
-                return self._generate_alternative_response(user_input, messages)
+                ai_response = self._generate_alternative_response(user_input, messages)
+            else:
+                logger.info(f"OpenAI response: {ai_response[:50]}...")
             
-            # Add AI response to history
-            self.conversation_history.add_message("assistant", ai_response)
+        except Exception as e:
+            logger.error(f"OpenAI API error: {e}")
+            ai_response = self._get_fallback_response(user_input)
+        
+        # Add the exchange to history
+        self.conversation_history.add_exchange(user_input, ai_response)
+        return ai_response
+    
+    def get_response_stream(self, user_input: str) -> Generator[str, None, None]:
+        """Stream AI response chunks, regenerating early if the opening is repetitive"""
+        ai_response = ""
+        shown = []  # Chunks the user was shown, added to history with the input at the end
+        checked = False
+        try:
+            messages = self._prepare_messages(user_input)
             
-            # Update token usage
-            if hasattr(response, 'usage'):
-                self.conversation_history.total_tokens += response.usage.total_tokens
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=150,
+                temperature=0.9,
+                frequency_penalty=0.8,
+                presence_penalty=0.6,
+                stream=True,
+                # A final chunk without choices then reports the token usage
+                extra_body={"stream_options": {"include_usage": True}}
+            )
+            
+            # Hold back the opening until it can be checked for repetition
+            for chunk in stream:
+                self._record_usage(chunk)
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content or ""
+                if not text:
+                    continue
+                ai_response += text
+                
+                if checked:
+                    shown.append(text)
+                    yield text
+                    continue
+                
+                if '?' not in ai_response and len(ai_response.split()) <= 8:
+                    continue
+                
+                checked = True
+                if self._is_response_repetitive(ai_response):
+                    logger.info("Detected repetitive response opening, regenerating...")
+                    stream.response.close()
+                    shown.append(self._generate_alternative_response(user_input, messages))
+                    yield shown[-1]
+                    return
+                shown.append(ai_response)
+                yield ai_response
+            
+            # Short responses may finish before the check was reached
+            if not checked and ai_response:
+                if self._is_response_repetitive(ai_response):
+                    logger.info("Detected repetitive response, regenerating...")
+                    shown.append(self._generate_alternative_response(user_input, messages))
+                    yield shown[-1]
+                    return
+                shown.append(ai_response)
+                yield ai_response
             
-            logger.info(f"OpenAI response: {ai_response[:50]}...")
-            return ai_response
+            logger.info(f"OpenAI streamed response: {ai_response.strip()[:50]}...")
             
         except Exception as e:
             logger.error(f"OpenAI API error: {e}")
-            return self._get_fallback_response(user_input)
+            if not shown:
+                shown.append(self._get_fallback_response(user_input))
+                yield shown[0]
+        finally:
+            # Also reached on errors and early close, keeping what was shown
+            reply = "".join(shown).strip()
+            if reply:
+                self.conversation_history.add_exchange(user_input, reply)
+    
+    def _record_usage(self, response):
+        """Add a response's token usage, including prompt cache hits, to the history"""
+        usage = getattr(response, 'usage', None)
+        if not usage:
+            return
+        
+        # Fields the installed SDK doesn't model yet arrive as plain dicts
+        if isinstance(usage, dict):
+            total, details = usage.get('total_tokens', 0), usage.get('prompt_tokens_details')
+        else:
+            total, details = usage.total_tokens, getattr(usage, 'prompt_tokens_details', None)
+        cached = None
+        if details:
+            cached = details.get('cached_tokens') if isinstance(details, dict) else getattr(details, 'cached_tokens', None)
+        with self.conversation_history.lock:
+            self.conversation_history.total_tokens += total or 0
+            self.conversation_history.cached_tokens += cached or 0
     
     def _get_conversation_guidance(self) -> str:
         """Generate conversation guidance based on recent patterns"""
         guidance_parts = []
         
         # Check message length patterns
-        recent_user_messages = [msg['content'] for msg in self.conversation_history.messages[-6:] 
-                               if msg['role'] == 'user']
+        recent_user_messages = [msg.content for msg in self.conversation_history.recent_messages
+                               if msg.role == 'user']
         
         if recent_user_messages:
             avg_length = sum(len(msg.split()) for msg in recent_user_messages) / len(recent_user_messages)
@@ -357,24 +723,22 @@ Remember: You're not just a language tutor - you're a conversation partner who w
     
     def _is_response_repetitive(self, response: str) -> bool:
         """Check if the AI response is repetitive"""
+        response_lower = response.lower()
+        
         # Check for repetitive questions
-        if '?' in response:
-            questions = [q.strip() + '?' for q in response.split('?') if q.strip()]
-            for question in questions:
-                if self.conversation_history.is_question_repetitive(question):
-                    return True
+        for question in ConversationHistory._extract_questions(response_lower):
+            if self.conversation_history.is_question_repetitive(question):
+                return True
         
         # Check for repetitive phrases in recent AI responses
-        recent_ai_responses = [msg['content'] for msg in self.conversation_history.messages[-6:] 
-                              if msg['role'] == 'assistant']
+        recent_ai_responses = self.conversation_history.recent_responses
         
         if len(recent_ai_responses) >= 2:
-            for prev_response in recent_ai_responses:
-                similarity = self.conversation_history._calculate_similarity(
-                    response.lower(), prev_response.lower()
-                )
-                if similarity > 0.6:  # 60% similarity threshold
-                    return True
+            history = self.conversation_history
+            response_bits, response_size = history._encode_query(response_lower)
+            # 60% similarity threshold
+            if history._any_similar(response_bits, response_size, recent_ai_responses, 0.6):
+                return True
         
         return False
     
@@ -399,11 +763,7 @@ Remember: You're not just a language tutor - you're a conversation partner who w
             
             alternative_response = response.choices[0].message.content.strip()
             
-            # Add to history
-            self.conversation_history.add_message("assistant", alternative_response)
-            
-            if hasattr(response, 'usage'):
-                self.conversation_history.total_tokens += response.usage.total_tokens
+            self._record_usage(response)
             
             logger.info(f"Alternative response generated: {alternative_response[:50]}...")
             return alternative_response
@@ -414,46 +774,17 @@ Remember: You're not just a language tutor - you're a conversation partner who w
     
     def _get_fallback_response(self, user_input: str) -> str:
         """Provide intelligent fallback response when API fails"""
+        if not hasattr(self, 'conversation_history'):
+            return choice(_NEUTRAL_FALLBACKS)
+        
         # Try to use user interests for personalized fallbacks
-        if hasattr(self, 'conversation_history') and self.conversation_history.user_interests:
-            interests = list(self.conversation_history.user_interests)
-            if 'cooking' in interests:
-                return "Speaking of cooking, have you discovered any interesting flavor combinations lately?"
-            elif 'travel' in interests:
-                return "Your travel experiences sound fascinating! What's been your most memorable journey so far?"
-            elif 'music' in interests:
-                return "I'm curious about your music taste. What genre speaks to your soul?"
+        user_interests = self.conversation_history.user_interests
+        for interest, fallback in _INTEREST_FALLBACKS.items():
+            if interest in user_interests:
+                return fallback
         
         # Sentiment-aware fallbacks
-        if hasattr(self, 'conversation_history'):
-            if self.conversation_history.last_user_sentiment == "positive":
-                fallbacks = [
-                    "Your enthusiasm is contagious! What else brings you joy?",
-                    "That sounds wonderful! I'd love to hear more about what makes it special.",
-                    "You seem really passionate about this - what got you interested in it?"
-                ]
-            elif self.conversation_history.last_user_sentiment == "negative":
-                fallbacks = [
-                    "That sounds challenging. How are you dealing with it?",
-                    "I can understand why that would be frustrating. What helps you cope?",
-                    "That must be tough. Is there anything positive you can take from the experience?"
-                ]
-            else:
-                fallbacks = [
-                    "That's fascinating! What's the story behind that?",
-                    "I'm intrigued - what's your perspective on this?",
-                    "That's an interesting angle. What led you to that conclusion?",
-                    "Tell me more about that - I'm genuinely curious."
-                ]
-        else:
-            fallbacks = [
-                "That's fascinating! What's the story behind that?",
-                "I'm intrigued - what's your perspective on this?",
-                "That's an interesting angle. What led you to that conclusion?"
-            ]
-        
-        import random
-        return random.choice(fallbacks)
+        return choice(_SENTIMENT_FALLBACKS[self.conversation_history.last_user_sentiment])
 
 class OllamaTutor:
     """Ollama-based conversation tutor for local AI"""
@@ -467,8 +798,15 @@ class OllamaTutor:
         self.conversation_history = ConversationHistory()
         self.system_prompt = self._get_system_prompt()
         
+        # Reuse keep-alive connections to the Ollama server across turns and web clients
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=16)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
         # Test connection
         if not self._test_connection():
+            self.close()
             raise RuntimeError(f"Cannot connect to Ollama at {base_url}")
         
         logger.info(f"Ollama tutor initialized with model: {model}")
@@ -476,24 +814,39 @@ class OllamaTutor:
     def _test_connection(self) -> bool:
         """Test connection to Ollama server"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
             return response.status_code == 200
         except:
             return False
     
+    def close(self):
+        """Close the HTTP session to the Ollama server"""
+        self.session.close()
+    
+    def warm_up(self):
+        """Have Ollama load the model into memory ahead of the first request"""
+        try:
+            # A generate request without a prompt only loads the model
+            self.session.post(f"{self.base_url}/api/generate", json={"model": self.model}, timeout=120)
+        except Exception as e:
+            logger.warning(f"Ollama warm-up failed: {e}")
+    
     def _get_system_prompt(self) -> str:
         """Get the system prompt for the AI tutor"""
         return """You are a curious and engaging conversation partner. Avoid repetitive questions. Remember previous topics. Ask follow-up questions based on user's interests. Be creative and spontaneous in your responses. Show genuine interest in the person you're talking to."""
     
     def get_response(self, user_input: str) -> Optional[str]:
         """Get AI response using Ollama"""
+        return "".join(self.get_response_stream(user_input))
+    
+    def get_response_stream(self, user_input: str) -> Generator[str, None, None]:
+        """Stream AI response chunks from Ollama as they are generated"""
+        ai_response = ""  # Text the user was shown, added to history with the input at the end
         try:
-            # Add user message to history
-            self.conversation_history.add_message("user", user_input)
-            
             # Prepare conversation context
             context = self.system_prompt + "\n\n"
-            recent_messages = self.conversation_history.get_messages(limit=6)
+            with self.conversation_history.lock:
+                recent_messages = self.conversation_history.get_messages(limit=5)
             
             for msg in recent_messages:
                 if msg["role"] == "user":
@@ -501,69 +854,248 @@ class OllamaTutor:
                 elif msg["role"] == "assistant":
                     context += f"Tutor: {msg['content']}\n"
             
-            context += "Tutor:"
+            context += f"Student: {user_input}\nTutor:"
             
-            # Make API call to Ollama
-            response = requests.post(
+            # Make streaming API call to Ollama
+            response = self.session.post(
                 f"{self.base_url}/api/generate",
                 json={
                     "model": self.model,
                     "prompt": context,
-                    "stream": False,
+                    "stream": True,
                     "options": {
                         "temperature": 0.9,
                         "top_p": 0.9,
                         "max_tokens": 100
                     }
                 },
+                stream=True,
                 timeout=30
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                ai_response = result.get("response", "").strip()
-                
-                # Clean up response
-                if ai_response.startswith("Tutor:"):
-                    ai_response = ai_response[6:].strip()
-                
-                # Add AI response to history
-                self.conversation_history.add_message("assistant", ai_response)
-                
-                logger.info(f"Ollama response: {ai_response[:50]}...")
-                return ai_response
-            else:
+            if response.status_code != 200:
                 logger.error(f"Ollama API error: {response.status_code}")
-                return self._get_fallback_response()
+                response.close()
+                ai_response = self._get_fallback_response()
+                yield ai_response
+                return
+            
+            # Hold back the start of the response until a leading "Tutor:" can be stripped
+            pending = ""
+            with response:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    
+                    chunk = _json_loads(line)
+                    text = chunk.get("response", "")
+                    
+                    if pending is not None:
+                        pending += text
+                        if len(pending.lstrip()) < 6 and not chunk.get("done"):
+                            continue
+                        text = pending.lstrip()
+                        if text.startswith("Tutor:"):
+                            text = text[6:].lstrip()
+                        pending = None
+                    
+                    if text:
+                        ai_response += text
+                        yield text
+                    
+                    if chunk.get("done"):
+                        break
+            
+            logger.info(f"Ollama response: {ai_response.strip()[:50]}...")
                 
         except Exception as e:
             logger.error(f"Ollama connection error: {e}")
-            return self._get_fallback_response()
+            if not ai_response:
+                ai_response = self._get_fallback_response()
+                yield ai_response
+        finally:
+            # Also reached on errors and early close, keeping what was shown
+            if ai_response.strip():
+                self.conversation_history.add_exchange(user_input, ai_response.strip())
     
     def _get_fallback_response(self) -> str:
         """Provide creative fallback response when Ollama fails"""
-        creative_fallbacks = [
-            "That sparks my curiosity! What's the most surprising thing about that?",
-            "Fascinating perspective! How did you come to that realization?",
-            "That's genuinely intriguing - what's the story behind it?",
-            "I'm drawn to that topic. What aspect excites you most?",
-            "Your experience sounds unique. What made it stand out?",
-            "That's thought-provoking. What unexpected lessons did you learn?"
-        ]
-        
-        import random
-        return random.choice(creative_fallbacks)
+        return choice(_CREATIVE_FALLBACKS)
+
+class ResponseCache:
+    """Bounded cache of tutor responses, matched by word-set similarity of the prompt"""
+    
+    def __init__(self, maxsize: int = 512, threshold: float = 0.9, exact_maxsize: int = 2048):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.exact_maxsize = exact_maxsize
+        self._exact = OrderedDict()  # (context, normalized prompt) -> response, oldest first
+        self._entries = OrderedDict()  # (context, frozenset of prompt words) -> response
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize(prompt: str) -> str:
+        # Case, punctuation and spacing don't change the question being asked
+        return " ".join(prompt.lower().translate(_PUNCTUATION_TABLE).split())
+    
+    @staticmethod
+    def _words(prompt: str) -> frozenset:
+        return frozenset(_WORD_RE.findall(prompt.lower()))
+    
+    def get(self, prompt: str, context=None) -> Optional[str]:
+        """Get the response cached for this prompt in this context, or the most similar one above the threshold
+        
+        context is a hashable key for everything else the response depends on,
+        e.g. the topic and the tutor's previous message.
+        """
+        exact_key = (context, self._normalize(prompt))
+        with self._lock:
+            # Exact repeats are a single dict lookup
+            response = self._exact.get(exact_key)
+            if response is not None:
+                self._exact.move_to_end(exact_key)
+                return response
+        
+        words = self._words(prompt)
+        if not words:
+            return None
+        
+        with self._lock:
+            key = (context, words)
+            response = self._entries.get(key)
+            if response is None:
+                best_key, best_similarity = None, self.threshold
+                size = len(words)
+                for entry_context, entry_words in self._entries:
+                    if entry_context != context:
+                        continue
+                    # Jaccard similarity can't reach the threshold if sizes differ too much
+                    if min(size, len(entry_words)) < best_similarity * max(size, len(entry_words)):
+                        continue
+                    # Prompts that differ by a negation ask the opposite thing
+                    if (words ^ entry_words) & NEGATION_WORDS:
+                        continue
+                    common = len(words & entry_words)
+                    similarity = common / (size + len(entry_words) - common)
+                    if similarity >= best_similarity:
+                        best_key, best_similarity = (entry_context, entry_words), similarity
+                if best_key is None:
+                    return None
+                key = best_key
+                response = self._entries[key]
+            
+            self._entries.move_to_end(key)
+            return response
+    
+    def clear(self):
+        """Forget all cached responses"""
+        with self._lock:
+            self._exact.clear()
+            self._entries.clear()
+    
+    def put(self, prompt: str, response: str, context=None):
+        """Cache a response for a prompt in a context (see get), evicting the least recently used entries"""
+        if not response:
+            return
+        
+        exact_key = (context, self._normalize(prompt))
+        words = self._words(prompt)
+        with self._lock:
+            self._exact[exact_key] = response
+            self._exact.move_to_end(exact_key)
+            if len(self._exact) > self.exact_maxsize:
+                self._exact.popitem(last=False)
+            
+            if words:
+                key = (context, words)
+                self._entries[key] = response
+                self._entries.move_to_end(key)
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
 
 class AITutorService:
     """Unified AI tutor service"""
     
+    DEFAULT_RESPONSE = "I'm sorry, I'm having trouble connecting to the AI service right now. Could you try again?"
+    
+    # Seconds to wait for an identical request already in flight before asking the provider anyway
+    INFLIGHT_TIMEOUT = 60
+    
+    # Turns of one scope run one at a time; scopes share this many striped locks
+    TURN_LOCKS = 64
+    
     def __init__(self):
         self.tutor = None
         self.provider = Config.AI_PROVIDER.lower()
         self.is_available = False
+        self.on_update: Optional[Callable[[Dict], None]] = None  # Called with get_stats() after changes
+        self._session_start_iso = (None, "")  # (session_start, its ISO string) for get_stats()
+        self._inflight: Dict[Tuple, Future] = {}  # (scope, context, prompt) -> response being generated
+        self._inflight_lock = threading.Lock()
+        self._turn_locks = [threading.Lock() for _ in range(self.TURN_LOCKS)]
         
         self._initialize_tutor()
     
+    def _join_inflight(self, user_input: str, scope: Hashable) -> Tuple[Tuple, Optional[Future], Optional[str]]:
+        """Share an identical in-flight request's response, or register a request we then own
+        
+        Returns (key, future, None) when the caller owns the new request and must finish
+        it with _finish_inflight, (key, None, response) with the shared response, or
+        (key, None, None) when the caller should answer on its own after a timeout.
+        Waiters never see the owner's errors: if the owner fails or is abandoned, one
+        waiter takes over the request, and the others wait on it instead.
+        """
+        key = (scope, self.context_key(), ResponseCache._normalize(user_input))
+        while True:
+            with self._inflight_lock:
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._inflight[key] = Future()
+                    return key, future, None
+            
+            try:
+                response = future.result(timeout=self.INFLIGHT_TIMEOUT)
+            except FutureTimeoutError:
+                logger.warning("Identical request still running, asking the provider separately")
+                return key, None, None
+            if response is not None:
+                return key, None, response
+            # The owner was abandoned before finishing, take over
+    
+    def _turn_lock(self, scope: Hashable) -> threading.Lock:
+        """The lock serializing the turns of a scope, so each builds on the previous one's history
+        
+        Unlike the history lock it is held for the whole turn, provider call and stream included;
+        clearing or saving the conversation doesn't wait for it.
+        """
+        return self._turn_locks[hash(scope) % self.TURN_LOCKS]
+    
+    def _reuse_response(self, user_input: str, scope: Hashable,
+                        lookup: Optional[Callable[[Hashable], Optional[str]]]) -> Optional[str]:
+        """Ask lookup for a stored response in this turn's context, recording a hit in the history"""
+        if lookup is None:
+            return None
+        response = lookup((scope, self.context_key()))
+        if response is not None:
+            self.tutor.conversation_history.add_exchange(user_input, response)
+        return response
+    
+    def _finish_inflight(self, key: Tuple, future: Future):
+        """Release waiters of an owned request; a failed or unfinished one lets a waiter take over"""
+        with self._inflight_lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if not future.done():
+            future.set_result(None)
+    
+    def _notify_update(self):
+        """Push fresh statistics to the on_update callback, if any"""
+        if self.on_update:
+            try:
+                self.on_update(self.get_stats())
+            except Exception as e:
+                logger.error(f"Stats update callback failed: {e}")
+    
     def _initialize_tutor(self):
         """Initialize the appropriate AI tutor"""
         try:
@@ -585,17 +1117,90 @@ class AITutorService:
             logger.error(f"Failed to initialize AI tutor: {e}")
             self.is_available = False
     
-    def get_response(self, user_input: str) -> str:
-        """Get AI response to user input"""
+    def get_response(self, user_input: str, scope: Hashable = None,
+                     lookup: Optional[Callable[[Hashable], Optional[str]]] = None) -> str:
+        """Get AI response to user input
+        
+        scope identifies the caller's conversation (e.g. a browser session); its turns run
+        one at a time, and identical prompts in flight at the same time share one response.
+        lookup, if given, is called with the turn's context (scope, context_key()) before
+        the provider and may return a stored response (e.g. from a cache) to use instead.
+        """
         if not self.is_available or not self.tutor:
             return self._get_default_response()
         
-        response = self.tutor.get_response(user_input)
-        return response or self._get_default_response()
+        # An identical prompt already being answered (e.g. a double-click) shares that answer
+        key, future, shared = self._join_inflight(user_input, scope)
+        if shared is not None:
+            return shared
+        
+        try:
+            with self._turn_lock(scope):
+                response = self._reuse_response(user_input, scope, lookup)
+                if response is None:
+                    response = self.tutor.get_response(user_input) or self._get_default_response()
+            self._notify_update()
+            if future:
+                future.set_result(response)
+            return response
+        finally:
+            if future:
+                self._finish_inflight(key, future)
+    
+    def context_key(self) -> Optional[str]:
+        """What the reply to the next prompt depends on besides the prompt: the tutor's last message"""
+        if self.tutor:
+            return self.tutor.conversation_history.last_response
+        return None
+    
+    def warm_up(self):
+        """Prepare the provider connection so the first response is not slowed down"""
+        if self.is_available and hasattr(self.tutor, 'warm_up'):
+            self.tutor.warm_up()
+    
+    def get_response_stream(self, user_input: str, scope: Hashable = None,
+                            lookup: Optional[Callable[[Hashable], Optional[str]]] = None) -> Generator[str, None, None]:
+        """Stream AI response chunks to user input (scope and lookup as for get_response)"""
+        if not self.is_available or not self.tutor:
+            yield self._get_default_response()
+            return
+        
+        if not hasattr(self.tutor, 'get_response_stream'):
+            yield self.get_response(user_input, scope, lookup)
+            return
+        
+        # An identical prompt already being answered gets that whole answer in one chunk
+        key, future, shared = self._join_inflight(user_input, scope)
+        if shared is not None:
+            yield shared
+            return
+        
+        chunks = []
+        try:
+            with self._turn_lock(scope):
+                reused = self._reuse_response(user_input, scope, lookup)
+                if reused is not None:
+                    chunks.append(reused)
+                    yield reused
+                else:
+                    for chunk in self.tutor.get_response_stream(user_input):
+                        chunks.append(chunk)
+                        yield chunk
+            self._notify_update()
+            
+            if not chunks:
+                chunks.append(self._get_default_response())
+                yield chunks[0]
+            if future:
+                future.set_result("".join(chunks))
+        finally:
+            # Also reached on errors and when the consumer closes the stream early
+            if future:
+                self._finish_inflight(key, future)
     
     def _get_default_response(self) -> str:
         """Default response when AI is not available"""
-        return "I'm sorry, I'm having trouble connecting to the AI service right now. Could you try again?"
+        return self.DEFAULT_RESPONSE
     
     def get_conversation_history(self) -> ConversationHistory:
         """Get current conversation history"""
@@ -606,19 +1211,28 @@ class AITutorService:
     def save_conversation(self, filename: Optional[str] = None) -> Optional[str]:
         """Save current conversation"""
         if self.tutor:
-            return self.tutor.conversation_history.save_to_file(filename)
+            history = self.tutor.conversation_history
+            with history.lock:
+                return history.save_to_file(filename)
         return None
     
     def load_conversation(self, filepath: str) -> bool:
         """Load conversation from file"""
         if self.tutor:
-            return self.tutor.conversation_history.load_from_file(filepath)
+            history = self.tutor.conversation_history
+            with history.lock:
+                loaded = history.load_from_file(filepath)
+            self._notify_update()
+            return loaded
         return False
     
     def clear_conversation(self):
         """Clear current conversation"""
         if self.tutor:
-            self.tutor.conversation_history.clear()
+            history = self.tutor.conversation_history
+            with history.lock:
+                history.clear()
+            self._notify_update()
     
     def get_stats(self) -> Dict[str, any]:
         """Get conversation statistics"""
@@ -626,18 +1240,22 @@ class AITutorService:
             return {}
         
         history = self.tutor.conversation_history
-        user_messages = [msg for msg in history.messages if msg["role"] == "user"]
-        ai_messages = [msg for msg in history.messages if msg["role"] == "assistant"]
+        
+        # Counters are kept up to date by the history; only reformat the start on a new session
+        session_start = history.session_start
+        if self._session_start_iso[0] is not session_start:
+            self._session_start_iso = (session_start, session_start.isoformat())
         
         return {
             "provider": self.provider,
             "is_available": self.is_available,
             "total_messages": len(history.messages),
-            "user_messages": len(user_messages),
-            "ai_messages": len(ai_messages),
+            "user_messages": history.user_count,
+            "ai_messages": history.ai_count,
             "total_tokens": history.total_tokens,
-            "session_duration": (datetime.now() - history.session_start).total_seconds(),
-            "session_start": history.session_start.isoformat()
+            "cached_tokens": history.cached_tokens,
+            "session_duration": (datetime.now() - session_start).total_seconds(),
+            "session_start": self._session_start_iso[1]
         }
 
 # Conversation topics and prompts
@@ -701,19 +1319,22 @@ class ConversationTopics:
         }
     }
     
+    _STARTERS = None  # Topic -> tuple of starters (None -> all topics), built on first use
+    
+    @classmethod
+    def _starters(cls, topic: Optional[str]) -> Tuple[str, ...]:
+        """Get the cached starters for a topic, or of every topic"""
+        if cls._STARTERS is None:
+            starters = {name: tuple(data["starters"]) for name, data in cls.TOPICS.items()}
+            starters[None] = tuple(s for topic_starters in starters.values() for s in topic_starters)
+            cls._STARTERS = starters
+        return cls._STARTERS.get(topic) or cls._STARTERS[None]
+    
     @classmethod
     def get_random_starter(cls, topic: Optional[str] = None) -> str:
         """Get a random conversation starter"""
-        import random
-        
-        if topic and topic in cls.TOPICS:
-            return random.choice(cls.TOPICS[topic]["starters"])
-        else:
-            # Random topic
-            all_starters = []
-            for topic_data in cls.TOPICS.values():
-                all_starters.extend(topic_data["starters"])
-            return random.choice(all_starters)
+        # Unknown or missing topics pick from all topics
+        return choice(cls._starters(topic))
     
     @classmethod
     def get_topic_list(cls) -> List[str]:
@@ -2,7 +2,9 @@
 Configuration module for English Conversation App
 """
 import os
+import atexit
 import logging
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -12,55 +14,76 @@ load_dotenv()
 class Config:
     """Application configuration"""
     
-    # Project directories
-    BASE_DIR = Path(__file__).parent.absolute()
-    CREDENTIALS_DIR = BASE_DIR / "credentials"
-    CONVERSATIONS_DIR = BASE_DIR / "conversations"
-    
-    # Google Cloud configuration
-    GOOGLE_APPLICATION_CREDENTIALS = os.getenv(
-        'GOOGLE_APPLICATION_CREDENTIALS', 
-        str(CREDENTIALS_DIR / "google-credentials.json")
-    )
-    GOOGLE_CLOUD_PROJECT = os.getenv('GOOGLE_CLOUD_PROJECT', 'speechtotext-472900')
-    
-    # Speech configuration
-    SPEECH_LANGUAGE = os.getenv('SPEECH_LANGUAGE', 'en-US')
-    AUDIO_SAMPLE_RATE = int(os.getenv('AUDIO_SAMPLE_RATE', '16000'))
-    AUDIO_CHUNK_SIZE = int(os.getenv('AUDIO_CHUNK_SIZE', '1024'))
-    
-    # Text-to-Speech configuration
-    TTS_LANGUAGE = os.getenv('TTS_LANGUAGE', 'en-US')
-    TTS_VOICE = os.getenv('TTS_VOICE', 'en-US-Wavenet-D')
-    TTS_SPEED = float(os.getenv('TTS_SPEED', '1.0'))
-    TTS_PITCH = float(os.getenv('TTS_PITCH', '0.0'))
-    
-    # AI configuration
-    AI_PROVIDER = os.getenv('AI_PROVIDER', 'openai')  # 'openai' or 'ollama'
-    OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
-    OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
-    
-    # Ollama configuration
-    OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
-    OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama2')
-    
-    # Offline mode configuration (Whisper)
-    OFFLINE_MODE = os.getenv('OFFLINE_MODE', 'false').lower() == 'true'
-    WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
-    
-    # UI Configuration
-    WINDOW_WIDTH = int(os.getenv('WINDOW_WIDTH', '800'))
-    WINDOW_HEIGHT = int(os.getenv('WINDOW_HEIGHT', '600'))
-    THEME = os.getenv('THEME', 'light')  # 'light' or 'dark'
-    
-    # Audio settings
-    VOICE_ACTIVATION_THRESHOLD = float(os.getenv('VOICE_ACTIVATION_THRESHOLD', '0.01'))
-    SILENCE_THRESHOLD = float(os.getenv('SILENCE_THRESHOLD', '0.5'))  # seconds
-    MAX_RECORDING_TIME = int(os.getenv('MAX_RECORDING_TIME', '30'))  # seconds
-    
-    # Logging configuration
-    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-    LOG_FILE = BASE_DIR / "app.log"
+    # Project directories (plain strings; BASE_DIR is kept as a Path)
+    _BASE = os.path.dirname(os.path.abspath(__file__))
+    BASE_DIR = Path(_BASE)
+    CREDENTIALS_DIR = os.path.join(_BASE, "credentials")
+    CONVERSATIONS_DIR = os.path.join(_BASE, "conversations")
+    LOG_FILE = os.path.join(_BASE, "app.log")
+    
+    # Snapshot of the environment, see _load_env_snapshot()
+    _env = {}
+    
+    # Set once setup_logging() has attached its handlers
+    _logging_ready = False
+    
+    @classmethod
+    def _load_env_snapshot(cls):
+        """Read the environment once and derive all settings from the snapshot"""
+        env = cls._env = dict(os.environ)
+        
+        # Google Cloud configuration
+        cls.GOOGLE_APPLICATION_CREDENTIALS = env.get(
+            'GOOGLE_APPLICATION_CREDENTIALS', 
+            os.path.join(cls.CREDENTIALS_DIR, "google-credentials.json")
+        )
+        cls.GOOGLE_CLOUD_PROJECT = env.get('GOOGLE_CLOUD_PROJECT', 'speechtotext-472900')
+        
+        # Speech configuration
+        cls.SPEECH_LANGUAGE = env.get('SPEECH_LANGUAGE', 'en-US')
+        cls.AUDIO_SAMPLE_RATE = int(env.get('AUDIO_SAMPLE_RATE', '16000'))
+        cls.AUDIO_CHUNK_SIZE = int(env.get('AUDIO_CHUNK_SIZE', '1024'))
+        
+        # Text-to-Speech configuration
+        cls.TTS_LANGUAGE = env.get('TTS_LANGUAGE', 'en-US')
+        cls.TTS_VOICE = env.get('TTS_VOICE', 'en-US-Wavenet-D')
+        cls.TTS_SPEED = float(env.get('TTS_SPEED', '1.0'))
+        cls.TTS_PITCH = float(env.get('TTS_PITCH', '0.0'))
+        
+        # AI configuration
+        cls.AI_PROVIDER = env.get('AI_PROVIDER', 'openai')  # 'openai' or 'ollama'
+        cls.OPENAI_API_KEY = env.get('OPENAI_API_KEY', '')
+        cls.OPENAI_MODEL = env.get('OPENAI_MODEL', 'gpt-3.5-turbo')
+        
+        # Ollama configuration
+        cls.OLLAMA_BASE_URL = env.get('OLLAMA_BASE_URL', 'http://localhost:11434')
+        cls.OLLAMA_MODEL = env.get('OLLAMA_MODEL', 'llama2')
+        
+        # Offline mode configuration (Whisper)
+        cls.OFFLINE_MODE = env.get('OFFLINE_MODE', 'false').lower() == 'true'
+        cls.WHISPER_MODEL = env.get('WHISPER_MODEL', 'base')
+        cls.XDG_CACHE_HOME = env.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+        
+        # UI Configuration
+        cls.WINDOW_WIDTH = int(env.get('WINDOW_WIDTH', '800'))
+        cls.WINDOW_HEIGHT = int(env.get('WINDOW_HEIGHT', '600'))
+        cls.THEME = env.get('THEME', 'light')  # 'light' or 'dark'
+        
+        # Audio settings
+        cls.VOICE_ACTIVATION_THRESHOLD = float(env.get('VOICE_ACTIVATION_THRESHOLD', '0.01'))
+        cls.VOICE_ACTIVATION_THRESHOLD_SQ = cls.VOICE_ACTIVATION_THRESHOLD ** 2  # vs. audio power
+        cls.SKIP_SILENT_RECORDINGS = env.get('SKIP_SILENT_RECORDINGS', 'false').lower() == 'true'  # May drop quiet speech
+        cls.SILENCE_THRESHOLD = float(env.get('SILENCE_THRESHOLD', '0.5'))  # seconds
+        cls.MAX_RECORDING_TIME = int(env.get('MAX_RECORDING_TIME', '30'))  # seconds
+        
+        # Logging configuration
+        cls.LOG_LEVEL = env.get('LOG_LEVEL', 'INFO')
+    
+    @classmethod
+    def reload(cls):
+        """Re-read the environment, e.g. after it was changed in tests"""
+        cls._load_env_snapshot()
+        AudioConfig.reload()
     
     @classmethod
     def validate_config(cls):
@@ -77,22 +100,29 @@ class Config:
             warnings.append("OpenAI API key not set. AI features will be limited.")
         
         # Check directories
-        cls.CREDENTIALS_DIR.mkdir(exist_ok=True)
-        cls.CONVERSATIONS_DIR.mkdir(exist_ok=True)
+        os.makedirs(cls.CREDENTIALS_DIR, exist_ok=True)
+        os.makedirs(cls.CONVERSATIONS_DIR, exist_ok=True)
         
         return errors, warnings
     
     @classmethod
     def setup_logging(cls):
-        """Setup logging configuration"""
-        logging.basicConfig(
-            level=getattr(logging, cls.LOG_LEVEL),
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(cls.LOG_FILE),
-                logging.StreamHandler()
-            ]
-        )
+        """Setup logging configuration (only the first call has an effect)"""
+        if cls._logging_ready:
+            return
+        cls._logging_ready = True
+        
+        root = logging.getLogger()
+        root.setLevel(logging.getLevelName(cls.LOG_LEVEL.upper()))
+        if root.hasHandlers():
+            return
+        
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        for handler in (logging.FileHandler(cls.LOG_FILE), logging.StreamHandler()):
+            handler.setFormatter(formatter)
+            root.addHandler(handler)
+
+Config._load_env_snapshot()
 
 class AudioConfig:
     """Audio-specific configuration"""
@@ -111,11 +141,54 @@ class AudioConfig:
     NOISE_REDUCTION = True
     AUTO_GAIN_CONTROL = True
     
+    @classmethod
+    def reload(cls):
+        """Pick up audio settings from a reloaded Config"""
+        if (cls.RATE, cls.CHUNK) != (Config.AUDIO_SAMPLE_RATE, Config.AUDIO_CHUNK_SIZE):
+            cls.RATE = Config.AUDIO_SAMPLE_RATE
+            cls.CHUNK = Config.AUDIO_CHUNK_SIZE
+            cls.FORMAT = None  # Format support depends on the rate, probe again
+    
+    # Process-wide PyAudio instance, see get_pyaudio()
+    _pyaudio = None
+    _pyaudio_lock = threading.Lock()
+    
+    @classmethod
+    def get_pyaudio(cls):
+        """Get the shared PyAudio instance, creating it on first use"""
+        with cls._pyaudio_lock:
+            if cls._pyaudio is None:
+                import pyaudio
+                cls._pyaudio = pyaudio.PyAudio()
+                atexit.register(cls._terminate_pyaudio)
+            return cls._pyaudio
+    
+    @classmethod
+    def _terminate_pyaudio(cls):
+        """Release PortAudio at interpreter exit"""
+        with cls._pyaudio_lock:
+            if cls._pyaudio is not None:
+                cls._pyaudio.terminate()
+                cls._pyaudio = None
+    
+    _format_lock = threading.Lock()
+    
     @classmethod
     def get_audio_format(cls):
-        """Get the best available audio format"""
-        try:
-            import pyaudio
+        """Get the best available audio format (probed once, then cached)"""
+        if cls.FORMAT is not None:
+            return cls.FORMAT
+        
+        # Callers arriving during a probe wait for its result
+        with cls._format_lock:
+            if cls.FORMAT is not None:
+                return cls.FORMAT
+            
+            try:
+                import pyaudio
+            except ImportError:
+                return None
+            
             # Try different formats in order of preference
             formats = [
                 pyaudio.paInt16,
@@ -124,28 +197,30 @@ class AudioConfig:
                 pyaudio.paFloat32
             ]
             
+            # Default fallback
+            best = pyaudio.paInt16
+            
+            p = cls.get_pyaudio()
             for fmt in formats:
                 try:
-                    p = pyaudio.PyAudio()
                     if p.is_format_supported(
                         rate=cls.RATE,
                         input_device=None,
                         input_channels=cls.CHANNELS,
                         input_format=fmt
                     ):
-                        cls.FORMAT = fmt
-                        p.terminate()
-                        return fmt
-                    p.terminate()
+                        best = fmt
+                        break
                 except:
                     continue
             
-            # Default fallback
-            cls.FORMAT = pyaudio.paInt16
-            return pyaudio.paInt16
-            
-        except ImportError:
-            return None
+            cls.FORMAT = best
+            return cls.FORMAT
+    
+    @classmethod
+    def probe_audio_format_async(cls):
+        """Start probing the audio format in the background"""
+        threading.Thread(target=cls.get_audio_format, daemon=True).start()
 
 class UIConfig:
     """UI-specific configuration"""
@@ -191,9 +266,34 @@ class UIConfig:
         theme = theme or Config.THEME
         return cls.COLORS.get(theme, cls.COLORS['light'])
 
+def _whisper_weights_path(model_name):
+    """Where Whisper caches downloaded weights for a model"""
+    return os.path.join(Config.XDG_CACHE_HOME, 'whisper', f"{model_name}.pt")
+
+def _preload_hot_files():
+    """Ask the kernel to read files needed soon into the page cache"""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    
+    paths = [Config.GOOGLE_APPLICATION_CREDENTIALS]
+    if Config.OFFLINE_MODE:
+        paths.append(_whisper_weights_path(Config.WHISPER_MODEL))
+    
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
 # Initialize configuration
 def initialize_config():
     """Initialize and validate configuration"""
+    threading.Thread(target=_preload_hot_files, daemon=True).start()
+    
     errors, warnings = Config.validate_config()
     
     if errors:
@@ -203,7 +303,7 @@ def initialize_config():
         print("Configuration warnings:\n" + "\n".join(warnings))
     
     Config.setup_logging()
-    AudioConfig.get_audio_format()
+    AudioConfig.probe_audio_format_async()
     
     return True
 
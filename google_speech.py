@@ -3,40 +3,96 @@ Google Cloud Speech and Text-to-Speech integration module
 """
 import os
 import io
+import functools
+import importlib.util
+import math
+import queue
+import subprocess
+import sys
 import threading
 import time
 import logging
-import wave
+import struct
+import tempfile
 import numpy as np
 from typing import Optional, Callable, Generator
-from pathlib import Path
 
-try:
-    import pyaudio
-    PYAUDIO_AVAILABLE = True
-except ImportError:
-    PYAUDIO_AVAILABLE = False
+def _module_available(name: str) -> bool:
+    """Check whether a module can be imported without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+# Heavy optional modules (whisper pulls in torch) are only located here and
+# imported by the classes that use them
+pyaudio = speech = texttospeech = whisper = None
+
+PYAUDIO_AVAILABLE = _module_available("pyaudio")
+if not PYAUDIO_AVAILABLE:
     print("PyAudio not available. Audio recording will be disabled.")
 
-try:
-    from google.cloud import speech
-    from google.cloud import texttospeech
-    GOOGLE_CLOUD_AVAILABLE = True
-except ImportError:
-    GOOGLE_CLOUD_AVAILABLE = False
+GOOGLE_CLOUD_AVAILABLE = (
+    _module_available("google.cloud.speech") and _module_available("google.cloud.texttospeech")
+)
+if not GOOGLE_CLOUD_AVAILABLE:
     print("Google Cloud libraries not available.")
 
-try:
-    import whisper
-    WHISPER_AVAILABLE = True
-except ImportError:
-    WHISPER_AVAILABLE = False
+WHISPER_AVAILABLE = _module_available("whisper")
+if not WHISPER_AVAILABLE:
     print("Whisper not available. Offline mode disabled.")
 
 from config import Config, AudioConfig
 
 logger = logging.getLogger(__name__)
 
+# Loaded Whisper models by name, shared across WhisperSpeechToText instances
+_whisper_models = {}
+_whisper_lock = threading.Lock()
+
+def _load_whisper_model(model_name: str):
+    """Load a Whisper model once; concurrent callers wait for the same load"""
+    global whisper
+    with _whisper_lock:
+        import whisper
+        model = _whisper_models.get(model_name)
+        if model is None:
+            model = _whisper_models[model_name] = whisper.load_model(model_name)
+        return model
+
+def preload_whisper_model(model_name: str):
+    """Start loading a Whisper model in a background thread"""
+    def preload():
+        try:
+            _load_whisper_model(model_name)
+            logger.info(f"Whisper model '{model_name}' preloaded")
+        except Exception as e:
+            logger.error(f"Failed to preload Whisper model: {e}")
+    
+    threading.Thread(target=preload, daemon=True).start()
+
+# Transient audio files go to tmpfs when available
+_TMP_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+# RIFF/WAVE header for PCM data: chunk sizes are patched in per file
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+
+def _wav_header_template(sample_width: int) -> bytearray:
+    """Build a mutable 44-byte WAV header for the configured audio format"""
+    channels, rate = AudioConfig.CHANNELS, AudioConfig.RATE
+    return bytearray(_WAV_HEADER.pack(
+        b'RIFF', 0, b'WAVE', b'fmt ', 16, 1, channels, rate,
+        rate * channels * sample_width, channels * sample_width, sample_width * 8,
+        b'data', 0
+    ))
+
+def _write_wav(filename: str, header: bytearray, audio_data: bytes):
+    """Write PCM data behind a header template to a WAV file"""
+    struct.pack_into('<I', header, 4, 36 + len(audio_data))
+    struct.pack_into('<I', header, 40, len(audio_data))
+    with open(filename, 'wb') as f:
+        f.writelines((header, audio_data))
+
 class AudioRecorder:
     """Audio recording class using PyAudio"""
     
@@ -44,21 +100,38 @@ class AudioRecorder:
         self.audio = None
         self.stream = None
         self.recording = False
-        self.audio_data = []
+        self.voice_detected = False  # Set once a chunk reaches the voice activation threshold
+        self._buffer = bytearray()  # Preallocated at start_recording
+        self._buffer_pos = 0
         self.callback = None
+        self.stream_chunks = False  # Also publish chunks for streaming transcription
+        self._chunk_queue = queue.Queue()
+        self._sample_width = 2  # Bytes per sample, resolved below
         
         if PYAUDIO_AVAILABLE:
-            self.audio = pyaudio.PyAudio()
+            global pyaudio
+            import pyaudio
+            self.audio = AudioConfig.get_pyaudio()
             AudioConfig.get_audio_format()
+            self._sample_width = self.audio.get_sample_size(AudioConfig.FORMAT)
+        self._wav_header = _wav_header_template(self._sample_width)
     
-    def start_recording(self, callback: Optional[Callable] = None):
+    def start_recording(self, callback: Optional[Callable] = None, stream_chunks: bool = False):
         """Start recording audio"""
         if not PYAUDIO_AVAILABLE:
             raise RuntimeError("PyAudio not available")
         
         self.callback = callback
+        self.stream_chunks = stream_chunks
+        self._chunk_queue = queue.Queue()
+        
+        # Preallocate room for the longest allowed recording
+        self._buffer = bytearray(
+            Config.MAX_RECORDING_TIME * AudioConfig.RATE * AudioConfig.CHANNELS * self._sample_width
+        )
+        self._buffer_pos = 0
+        self.voice_detected = False
         self.recording = True
-        self.audio_data = []
         
         try:
             self.stream = self.audio.open(
@@ -88,43 +161,86 @@ class AudioRecorder:
             self.stream.close()
             self.stream = None
         
-        # Convert to bytes
-        audio_bytes = b''.join(self.audio_data)
+        # No more chunks can arrive, so tell the streaming consumer to finish
+        if self.stream_chunks:
+            self._chunk_queue.put(None)
+        
+        # Copy the recorded part out of the buffer
+        audio_bytes = bytes(memoryview(self._buffer)[:self._buffer_pos])
         logger.info(f"Recording stopped. Audio data size: {len(audio_bytes)} bytes")
         return audio_bytes
     
     def _audio_callback(self, in_data, frame_count, time_info, status):
         """Callback for audio stream"""
         if self.recording:
-            self.audio_data.append(in_data)
+            start = self._buffer_pos
+            end = min(start + len(in_data), len(self._buffer))
+            self._buffer[start:end] = in_data[:end - start]
+            self._buffer_pos = end
+            
+            if self.stream_chunks:
+                self._chunk_queue.put(in_data)
+            
+            # Power is computed at most once per chunk and shared by both uses
+            power = None
+            
+            # Chunks are only checked until the first one with speech
+            if Config.SKIP_SILENT_RECORDINGS and not self.voice_detected:
+                power = self._calculate_audio_power(in_data)
+                self.voice_detected = self.is_voice(power)
             
             # Calculate audio level for visualization
             if self.callback:
-                audio_level = self._calculate_audio_level(in_data)
-                self.callback(audio_level)
+                if power is None:
+                    power = self._calculate_audio_power(in_data)
+                self.callback(math.sqrt(power))
+            
+            # The buffer holds MAX_RECORDING_TIME; end the stream rather than drop audio silently
+            if end == len(self._buffer):
+                logger.warning(f"Maximum recording time of {Config.MAX_RECORDING_TIME}s reached, recording stopped")
+                return (in_data, pyaudio.paComplete)
         
         return (in_data, pyaudio.paContinue)
     
-    def _calculate_audio_level(self, audio_data: bytes) -> float:
-        """Calculate audio level (0.0 to 1.0)"""
+    def chunks(self) -> Generator[bytes, None, None]:
+        """Yield the current recording's chunks as they arrive until it stops"""
+        # Bind this recording's queue now, so a later recording can't feed this generator
+        return self._drain_chunks(self._chunk_queue)
+    
+    @staticmethod
+    def _drain_chunks(chunk_queue: queue.Queue) -> Generator[bytes, None, None]:
+        """Yield chunks from a queue until the end-of-recording sentinel"""
+        while True:
+            chunk = chunk_queue.get()
+            if chunk is None:
+                return
+            yield chunk
+    
+    def _calculate_audio_power(self, audio_data: bytes) -> float:
+        """Calculate audio power, the squared level (0.0 to 1.0)"""
         try:
-            # Convert bytes to numpy array
-            audio_np = np.frombuffer(audio_data, dtype=np.int16)
-            # Calculate RMS
-            rms = np.sqrt(np.mean(audio_np**2))
-            # Normalize to 0-1 range
-            return min(1.0, rms / 32767.0)
+            # Convert bytes to float samples (int16 squares would overflow)
+            samples = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32)
+            if not samples.size:
+                return 0.0
+            # Mean square with a single dot product, normalized to 0-1 range
+            return min(1.0, float(np.dot(samples, samples)) / (samples.size * 32767.0 ** 2))
         except:
             return 0.0
     
+    def _calculate_audio_level(self, audio_data: bytes) -> float:
+        """Calculate audio level (0.0 to 1.0)"""
+        return math.sqrt(self._calculate_audio_power(audio_data))
+    
+    @staticmethod
+    def is_voice(power: float) -> bool:
+        """Check whether an audio power is above the voice activation threshold"""
+        return power >= Config.VOICE_ACTIVATION_THRESHOLD_SQ
+    
     def save_audio(self, audio_data: bytes, filename: str):
         """Save audio data to WAV file"""
         try:
-            with wave.open(filename, 'wb') as wf:
-                wf.setnchannels(AudioConfig.CHANNELS)
-                wf.setsampwidth(self.audio.get_sample_size(AudioConfig.FORMAT))
-                wf.setframerate(AudioConfig.RATE)
-                wf.writeframes(audio_data)
+            _write_wav(filename, self._wav_header, audio_data)
             logger.info(f"Audio saved to {filename}")
         except Exception as e:
             logger.error(f"Failed to save audio: {e}")
@@ -133,8 +249,45 @@ class AudioRecorder:
         """Cleanup audio resources"""
         if self.stream:
             self.stream.close()
-        if self.audio:
-            self.audio.terminate()
+            self.stream = None
+        # self.audio is the shared PyAudio instance, terminated at exit
+
+# Request configs depend only on settings, so they are built once per set of values
+@functools.lru_cache(maxsize=4)
+def _stt_config(sample_rate: int, language: str):
+    """Build the Speech-to-Text recognition config"""
+    return speech.RecognitionConfig(
+        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+        sample_rate_hertz=sample_rate,
+        language_code=language,
+        enable_automatic_punctuation=True,
+        enable_word_confidence=True,
+        enable_word_time_offsets=True,
+    )
+
+@functools.lru_cache(maxsize=4)
+def _stt_streaming_config(sample_rate: int, language: str, interim_results: bool):
+    """Build the streaming config around the recognition config"""
+    return speech.StreamingRecognitionConfig(
+        config=_stt_config(sample_rate, language),
+        interim_results=interim_results,
+    )
+
+@functools.lru_cache(maxsize=4)
+def _tts_configs(language: str, voice: str, sample_rate: int, speed: float, pitch: float):
+    """Build the Text-to-Speech voice and audio configs"""
+    voice_params = texttospeech.VoiceSelectionParams(
+        language_code=language,
+        name=voice,
+    )
+    # Raw 16-bit PCM so playback needs no decoder or temp files
+    audio_config = texttospeech.AudioConfig(
+        audio_encoding=texttospeech.AudioEncoding.LINEAR16,
+        sample_rate_hertz=sample_rate,
+        speaking_rate=speed,
+        pitch=pitch,
+    )
+    return voice_params, audio_config
 
 class GoogleSpeechToText:
     """Google Cloud Speech-to-Text client"""
@@ -143,16 +296,13 @@ class GoogleSpeechToText:
         if not GOOGLE_CLOUD_AVAILABLE:
             raise RuntimeError("Google Cloud Speech library not available")
         
+        global speech
+        from google.cloud import speech
+        
         try:
             self.client = speech.SpeechClient()
-            self.config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-                sample_rate_hertz=Config.AUDIO_SAMPLE_RATE,
-                language_code=Config.SPEECH_LANGUAGE,
-                enable_automatic_punctuation=True,
-                enable_word_confidence=True,
-                enable_word_time_offsets=True,
-            )
+            self._config_key = (Config.AUDIO_SAMPLE_RATE, Config.SPEECH_LANGUAGE)
+            self.config = _stt_config(*self._config_key)
             logger.info("Google Speech-to-Text client initialized")
         except Exception as e:
             logger.error(f"Failed to initialize Speech-to-Text client: {e}")
@@ -176,7 +326,8 @@ class GoogleSpeechToText:
             logger.error(f"Transcription failed: {e}")
             return None
     
-    def streaming_transcribe(self, audio_generator: Generator) -> Generator[str, None, None]:
+    def streaming_transcribe(self, audio_generator: Generator,
+                             interim_results: bool = True) -> Generator[str, None, None]:
         """Stream transcription results"""
         try:
             requests = (
@@ -184,10 +335,7 @@ class GoogleSpeechToText:
                 for chunk in audio_generator
             )
             
-            streaming_config = speech.StreamingRecognitionConfig(
-                config=self.config,
-                interim_results=True,
-            )
+            streaming_config = _stt_streaming_config(*self._config_key, interim_results)
             
             responses = self.client.streaming_recognize(
                 config=streaming_config,
@@ -210,17 +358,17 @@ class GoogleTextToSpeech:
         if not GOOGLE_CLOUD_AVAILABLE:
             raise RuntimeError("Google Cloud Text-to-Speech library not available")
         
+        global texttospeech
+        from google.cloud import texttospeech
+        
         try:
             self.client = texttospeech.TextToSpeechClient()
-            self.voice = texttospeech.VoiceSelectionParams(
-                language_code=Config.TTS_LANGUAGE,
-                name=Config.TTS_VOICE,
-            )
-            self.audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3,
-                speaking_rate=Config.TTS_SPEED,
-                pitch=Config.TTS_PITCH,
+            self.voice, self.audio_config = _tts_configs(
+                Config.TTS_LANGUAGE, Config.TTS_VOICE, Config.AUDIO_SAMPLE_RATE,
+                Config.TTS_SPEED, Config.TTS_PITCH
             )
+            self._out = None
+            self._play_lock = threading.Lock()
             logger.info("Google Text-to-Speech client initialized")
         except Exception as e:
             logger.error(f"Failed to initialize Text-to-Speech client: {e}")
@@ -244,24 +392,65 @@ class GoogleTextToSpeech:
             return None
     
     def play_audio(self, audio_data: bytes):
-        """Play audio data"""
+        """Play LINEAR16 audio data through the PyAudio output stream"""
         try:
-            # Save to temporary file and play
-            temp_file = Path.cwd() / "temp_audio.mp3"
-            with open(temp_file, "wb") as f:
-                f.write(audio_data)
+            # LINEAR16 responses carry a WAV header in front of the samples
+            if audio_data[:4] == b'RIFF':
+                audio_data = audio_data[44:]
             
-            # Play using system command
-            if os.name == 'nt':  # Windows
-                os.system(f'start "" "{temp_file}"')
-            else:  # Linux/Mac
-                os.system(f'mpg123 "{temp_file}"')
+            if not PYAUDIO_AVAILABLE:
+                self._play_with_system_player(audio_data)
+                return
             
-            # Clean up after a delay
-            threading.Timer(3.0, lambda: temp_file.unlink(missing_ok=True)).start()
+            with self._play_lock:
+                if self._out is None:
+                    global pyaudio
+                    import pyaudio
+                    self._out = AudioConfig.get_pyaudio().open(
+                        format=pyaudio.paInt16,
+                        channels=1,
+                        rate=Config.AUDIO_SAMPLE_RATE,
+                        output=True
+                    )
+                self._out.write(audio_data)
             
         except Exception as e:
             logger.error(f"Failed to play audio: {e}")
+    
+    def _play_with_system_player(self, audio_data: bytes):
+        """Play audio with the platform's WAV player, removing the file once it finishes"""
+        fd, temp_file = tempfile.mkstemp(suffix='.wav', dir=_TMP_DIR)
+        os.close(fd)
+        _write_wav(temp_file, _wav_header_template(2), audio_data)
+        
+        if os.name == 'nt':  # Windows
+            import winsound
+            try:
+                winsound.PlaySound(temp_file, winsound.SND_FILENAME)
+            finally:
+                os.unlink(temp_file)
+            return
+        
+        command = ['afplay', temp_file] if sys.platform == 'darwin' else ['aplay', '-q', temp_file]
+        try:
+            process = subprocess.Popen(command)
+        except OSError:
+            os.unlink(temp_file)
+            raise
+        
+        def reap():
+            process.wait()
+            os.unlink(temp_file)
+        
+        threading.Thread(target=reap, daemon=True).start()
+    
+    def cleanup(self):
+        """Close the output stream"""
+        with self._play_lock:
+            if self._out:
+                self._out.stop_stream()
+                self._out.close()
+                self._out = None
 
 class WhisperSpeechToText:
     """Offline speech-to-text using Whisper"""
@@ -271,14 +460,18 @@ class WhisperSpeechToText:
             raise RuntimeError("Whisper not available")
         
         try:
-            self.model = whisper.load_model(model_name)
+            self.model = _load_whisper_model(model_name)
+            self._wav_header = _wav_header_template(2)  # 16-bit
             logger.info(f"Whisper model '{model_name}' loaded")
         except Exception as e:
             logger.error(f"Failed to load Whisper model: {e}")
             raise
     
-    def transcribe_audio_file(self, audio_file: str) -> Optional[str]:
-        """Transcribe audio file using Whisper"""
+    # Whisper's native sample rate; arrays at this rate skip ffmpeg decoding
+    NATIVE_RATE = 16000
+    
+    def transcribe_audio_file(self, audio_file) -> Optional[str]:
+        """Transcribe an audio file (or a float32 array at 16 kHz) using Whisper"""
         try:
             result = self.model.transcribe(audio_file)
             text = result["text"].strip()
@@ -291,22 +484,20 @@ class WhisperSpeechToText:
     def transcribe_audio_data(self, audio_data: bytes) -> Optional[str]:
         """Transcribe audio data using Whisper"""
         try:
-            # Save to temporary file
-            temp_file = Path.cwd() / "temp_audio.wav"
-            
-            with wave.open(str(temp_file), 'wb') as wf:
-                wf.setnchannels(AudioConfig.CHANNELS)
-                wf.setsampwidth(2)  # 16-bit
-                wf.setframerate(AudioConfig.RATE)
-                wf.writeframes(audio_data)
+            if AudioConfig.RATE == self.NATIVE_RATE:
+                # 16-bit PCM straight to normalised float32 samples, no file or ffmpeg
+                samples = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32)
+                samples /= 32768.0
+                return self.transcribe_audio_file(samples)
             
-            # Transcribe
-            result = self.transcribe_audio_file(str(temp_file))
-            
-            # Cleanup
-            temp_file.unlink(missing_ok=True)
-            
-            return result
+            # Other rates need ffmpeg to resample, so go through a temporary file
+            fd, temp_file = tempfile.mkstemp(suffix='.wav', dir=_TMP_DIR)
+            os.close(fd)
+            try:
+                _write_wav(temp_file, self._wav_header, audio_data)
+                return self.transcribe_audio_file(temp_file)
+            finally:
+                os.unlink(temp_file)
         except Exception as e:
             logger.error(f"Whisper transcription failed: {e}")
             return None
@@ -320,6 +511,8 @@ class SpeechService:
         self.google_tts = None
         self.whisper_stt = None
         self.offline_mode = Config.OFFLINE_MODE
+        self._stream_thread = None
+        self._stream_result = None  # Per-recording holder the streaming thread writes into
         
         # Initialize services based on availability
         if GOOGLE_CLOUD_AVAILABLE and not self.offline_mode:
@@ -344,10 +537,29 @@ class SpeechService:
     
     def start_recording(self, callback: Optional[Callable] = None):
         """Start audio recording"""
-        if self.recorder:
-            self.recorder.start_recording(callback)
-        else:
+        if not self.recorder:
             raise RuntimeError("Audio recorder not available")
+        
+        # With Google STT, upload audio while recording instead of after it
+        streaming = self.google_stt is not None and not self.offline_mode
+        self.recorder.start_recording(callback, stream_chunks=streaming)
+        
+        if streaming:
+            # Each recording gets its own chunk source and result, so a thread
+            # that outlives its recording can't touch the next one
+            self._stream_result = {}
+            self._stream_thread = threading.Thread(
+                target=self._run_streaming_transcription,
+                args=(self.recorder.chunks(), self._stream_result),
+                daemon=True
+            )
+            self._stream_thread.start()
+    
+    def _run_streaming_transcription(self, chunks: Generator, result: dict):
+        """Transcribe recorder chunks with Google streaming recognition"""
+        transcripts = self.google_stt.streaming_transcribe(chunks, interim_results=False)
+        text = " ".join(t.strip() for t in transcripts if t.strip())
+        result['transcript'] = text or None
     
     def stop_recording_and_transcribe(self) -> Optional[str]:
         """Stop recording and transcribe the audio"""
@@ -355,9 +567,24 @@ class SpeechService:
             return None
         
         audio_data = self.recorder.stop_recording()
+        
+        stream_thread, self._stream_thread = self._stream_thread, None
+        stream_result, self._stream_result = self._stream_result, None
+        if stream_thread:
+            stream_thread.join(timeout=10.0)
+            transcript = stream_result.get('transcript')
+            if transcript:
+                logger.info(f"Streaming transcription: '{transcript}'")
+                return transcript
+        
         if not audio_data:
             return None
         
+        # Optionally skip the upload when nothing reached the voice activation threshold
+        if Config.SKIP_SILENT_RECORDINGS and not self.recorder.voice_detected:
+            logger.info("No speech detected, skipping transcription")
+            return None
+        
         # Transcribe using available service
         if self.google_stt and not self.offline_mode:
             return self.google_stt.transcribe_audio(audio_data)
@@ -392,6 +619,12 @@ class SpeechService:
         """Cleanup all resources"""
         if self.recorder:
             self.recorder.cleanup()
+        if self.google_tts:
+            self.google_tts.cleanup()
+
+# Whisper will be needed when running offline, so load it while the app starts
+if WHISPER_AVAILABLE and (Config.OFFLINE_MODE or not GOOGLE_CLOUD_AVAILABLE):
+    preload_whisper_model(Config.WHISPER_MODEL)
 
 # Test functions
 def test_speech_services():
@@ -3,7 +3,7 @@ English Conversation Practice Desktop App
 Main GUI Application using tkinter
 """
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, scrolledtext
+from tkinter import ttk, messagebox, filedialog
 import threading
 import time
 import logging
@@ -31,9 +31,17 @@ class ConversationApp:
         
         # Initialize services
         self.speech_service = None
+        self._speech_ok = False  # Cached speech_service.is_available()
         self.ai_service = None
         self.is_recording = False
         self.conversation_active = False
+        self._debounced = {}  # Pending debounced callbacks by key
+        self._session_start = None  # time.monotonic() of the first conversation message
+        self._provider_generation = 0
+        
+        # Fonts used throughout the widgets
+        self._font_default = UIConfig.FONTS['default']
+        self._font_heading = UIConfig.FONTS['heading']
         
         # Initialize GUI
         self.root = tk.Tk()
@@ -69,21 +77,21 @@ class ConversationApp:
         
         # Configure styles
         style.configure('Title.TLabel', 
-                       font=UIConfig.FONTS['heading'],
+                       font=self._font_heading,
                        background=self.colors['bg'],
                        foreground=self.colors['fg'])
         
         style.configure('Status.TLabel',
-                       font=UIConfig.FONTS['default'],
+                       font=self._font_default,
                        background=self.colors['bg'],
                        foreground=self.colors['secondary'])
         
         style.configure('Record.TButton',
-                       font=UIConfig.FONTS['default'],
+                       font=self._font_default,
                        background=self.colors['success'])
         
         style.configure('Stop.TButton',
-                       font=UIConfig.FONTS['default'],
+                       font=self._font_default,
                        background=self.colors['error'])
     
     def create_widgets(self):
@@ -130,6 +138,8 @@ class ConversationApp:
         # Audio level indicator
         ttk.Label(control_frame, text="Audio Level:").pack(anchor=tk.W, pady=(10, 2))
         self.audio_level_var = tk.DoubleVar()
+        self._pending_level = 0.0
+        self._level_scheduled = False
         self.audio_level_bar = ttk.Progressbar(control_frame, 
                                              variable=self.audio_level_var,
                                              maximum=1.0)
@@ -142,9 +152,14 @@ class ConversationApp:
                  ("Food & Cooking", "food"), ("Hobbies", "hobbies"),
                  ("Work & Study", "work_study"), ("Goals & Dreams", "future_goals")]
         
-        for text, value in topics:
-            ttk.Radiobutton(control_frame, text=text, variable=self.topic_var,
-                           value=value).pack(anchor=tk.W)
+        # One read-only combobox instead of a radio button per topic
+        self._topic_labels = dict(topics)
+        topic_combo = ttk.Combobox(control_frame, values=list(self._topic_labels),
+                                   state="readonly")
+        topic_combo.set(topics[0][0])
+        topic_combo.bind("<<ComboboxSelected>>",
+                         lambda e: self.topic_var.set(self._topic_labels[topic_combo.get()]))
+        topic_combo.pack(fill=tk.X)
         
         # Action buttons
         ttk.Button(control_frame, text="🎯 Start Topic",
@@ -167,16 +182,35 @@ class ConversationApp:
         conv_frame.rowconfigure(0, weight=1)
         
         # Conversation display
-        self.conversation_text = scrolledtext.ScrolledText(
+        self.conversation_text = tk.Text(
             conv_frame, 
             height=20, 
             width=50,
-            font=UIConfig.FONTS['default'],
-            wrap=tk.WORD,
-            state=tk.DISABLED
+            font=self._font_default,
+            wrap=tk.WORD
         )
         self.conversation_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        scrollbar = ttk.Scrollbar(conv_frame, orient=tk.VERTICAL,
+                                  command=self.conversation_text.yview)
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.conversation_text.configure(yscrollcommand=scrollbar.set)
+        
+        # Read-only by swallowing edits, so appending needs no state toggling
+        self.conversation_text.bind("<Key>", self._block_edit_keys)
+        for sequence in ("<<Paste>>", "<<Cut>>", "<<Clear>>", "<Button-2>"):
+            self.conversation_text.bind(sequence, lambda e: "break")
+        
+        # Configure tags for different speakers
+        self.conversation_text.tag_configure("user_prefix", foreground="#2E8B57", font=self._font_default)
+        self.conversation_text.tag_configure("user", foreground="#2E8B57")
+        
+        self.conversation_text.tag_configure("ai_prefix", foreground="#4169E1", font=self._font_default)
+        self.conversation_text.tag_configure("ai", foreground="#4169E1")
+        
+        self.conversation_text.tag_configure("system_prefix", foreground="#888888", font=self._font_default)
+        self.conversation_text.tag_configure("system", foreground="#888888")
+        
         # Input area
         input_frame = ttk.Frame(conv_frame)
         input_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(10, 0))
@@ -184,7 +218,7 @@ class ConversationApp:
         
         ttk.Label(input_frame, text="Type your message:").grid(row=0, column=0, sticky=tk.W)
         
-        self.message_entry = tk.Entry(input_frame, font=UIConfig.FONTS['default'])
+        self.message_entry = tk.Entry(input_frame, font=self._font_default)
         self.message_entry.grid(row=1, column=0, sticky=(tk.W, tk.E), padx=(0, 5))
         self.message_entry.bind('<Return>', self.send_text_message)
         
@@ -196,5 +230,673 @@ class ConversationApp:
         self.transcription_var = tk.StringVar(value="Click 'Start Recording' and speak...")
         transcription_label = ttk.Label(conv_frame, textvariable=self.transcription_var,
                                        foreground=self.colors['secondary'],
-                                       font=UIConfig.FONTS['default'])
-        transcription_label.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=2)\n    \n    def create_info_panel(self, parent):\n        \"\"\"Create the information panel\"\"\"\n        info_frame = ttk.LabelFrame(parent, text=\"📊 Information\", padding=\"10\")\n        info_frame.grid(row=1, column=2, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(5, 0))\n        \n        # Service status\n        ttk.Label(info_frame, text=\"🔧 Service Status:\", \n                 font=UIConfig.FONTS['heading']).pack(anchor=tk.W, pady=(0, 5))\n        \n        self.speech_status_var = tk.StringVar(value=\"Speech: Checking...\")\n        ttk.Label(info_frame, textvariable=self.speech_status_var).pack(anchor=tk.W)\n        \n        self.ai_status_var = tk.StringVar(value=\"AI: Checking...\")\n        ttk.Label(info_frame, textvariable=self.ai_status_var).pack(anchor=tk.W)\n        \n        # Statistics\n        ttk.Label(info_frame, text=\"📈 Session Stats:\", \n                 font=UIConfig.FONTS['heading']).pack(anchor=tk.W, pady=(15, 5))\n        \n        self.messages_count_var = tk.StringVar(value=\"Messages: 0\")\n        ttk.Label(info_frame, textvariable=self.messages_count_var).pack(anchor=tk.W)\n        \n        self.session_time_var = tk.StringVar(value=\"Duration: 0:00\")\n        ttk.Label(info_frame, textvariable=self.session_time_var).pack(anchor=tk.W)\n        \n        self.tokens_var = tk.StringVar(value=\"Tokens: 0\")\n        ttk.Label(info_frame, textvariable=self.tokens_var).pack(anchor=tk.W)\n        \n        # Settings\n        ttk.Label(info_frame, text=\"⚙️ Settings:\", \n                 font=UIConfig.FONTS['heading']).pack(anchor=tk.W, pady=(15, 5))\n        \n        # AI Provider selection\n        self.ai_provider_var = tk.StringVar(value=Config.AI_PROVIDER)\n        ttk.Label(info_frame, text=\"AI Provider:\").pack(anchor=tk.W)\n        provider_frame = ttk.Frame(info_frame)\n        provider_frame.pack(fill=tk.X, pady=2)\n        \n        ttk.Radiobutton(provider_frame, text=\"OpenAI\", variable=self.ai_provider_var,\n                       value=\"openai\", command=self.change_ai_provider).pack(anchor=tk.W)\n        ttk.Radiobutton(provider_frame, text=\"Ollama\", variable=self.ai_provider_var,\n                       value=\"ollama\", command=self.change_ai_provider).pack(anchor=tk.W)\n        \n        # Offline mode toggle\n        self.offline_mode_var = tk.BooleanVar(value=Config.OFFLINE_MODE)\n        ttk.Checkbutton(info_frame, text=\"Offline Mode (Whisper)\",\n                       variable=self.offline_mode_var,\n                       command=self.toggle_offline_mode).pack(anchor=tk.W, pady=5)\n        \n        # TTS Speed control\n        ttk.Label(info_frame, text=\"Speech Speed:\").pack(anchor=tk.W, pady=(10, 2))\n        self.tts_speed_var = tk.DoubleVar(value=Config.TTS_SPEED)\n        speed_scale = ttk.Scale(info_frame, from_=0.5, to=2.0, \n                               variable=self.tts_speed_var, orient=tk.HORIZONTAL)\n        speed_scale.pack(fill=tk.X)\n        \n        # Test buttons\n        ttk.Button(info_frame, text=\"🔊 Test TTS\",\n                  command=self.test_tts).pack(fill=tk.X, pady=(10, 2))\n        \n        ttk.Button(info_frame, text=\"🎤 Test Recording\",\n                  command=self.test_recording).pack(fill=tk.X, pady=2)\n    \n    def create_status_panel(self, parent):\n        \"\"\"Create the status panel\"\"\"\n        status_frame = ttk.Frame(parent)\n        status_frame.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(10, 0))\n        status_frame.columnconfigure(0, weight=1)\n        \n        self.status_var = tk.StringVar(value=\"Initializing...\")\n        status_label = ttk.Label(status_frame, textvariable=self.status_var,\n                                style='Status.TLabel')\n        status_label.grid(row=0, column=0, sticky=tk.W)\n        \n        # Progress bar for loading operations\n        self.progress_var = tk.DoubleVar()\n        self.progress_bar = ttk.Progressbar(status_frame, variable=self.progress_var,\n                                          mode='indeterminate')\n        self.progress_bar.grid(row=0, column=1, sticky=tk.E, padx=(10, 0))\n    \n    def setup_events(self):\n        \"\"\"Setup event handlers\"\"\"\n        self.root.protocol(\"WM_DELETE_WINDOW\", self.on_closing)\n        \n        # Start periodic updates\n        self.update_stats()\n        self.update_session_time()\n    \n    def setup_services(self):\n        \"\"\"Initialize speech and AI services\"\"\"\n        def init_services():\n            try:\n                self.progress_bar.start()\n                \n                # Initialize speech service\n                self.update_status(\"Initializing speech services...\")\n                self.speech_service = SpeechService()\n                \n                if self.speech_service.is_available():\n                    self.speech_status_var.set(\"Speech: ✅ Ready\")\n                    logger.info(\"Speech service initialized successfully\")\n                else:\n                    self.speech_status_var.set(\"Speech: ❌ Not available\")\n                    logger.warning(\"Speech service not available\")\n                \n                # Initialize AI service\n                self.update_status(\"Initializing AI tutor...\")\n                self.ai_service = AITutorService()\n                \n                if self.ai_service.is_available:\n                    self.ai_status_var.set(f\"AI: ✅ {self.ai_service.provider.title()}\")\n                    logger.info(\"AI service initialized successfully\")\n                else:\n                    self.ai_status_var.set(\"AI: ❌ Not available\")\n                    logger.warning(\"AI service not available\")\n                \n                self.progress_bar.stop()\n                self.update_status(\"All services ready!\")\n                \n            except Exception as e:\n                logger.error(f\"Service initialization failed: {e}\")\n                self.progress_bar.stop()\n                self.update_status(f\"Service error: {e}\")\n                messagebox.showerror(\"Service Error\", f\"Failed to initialize services: {e}\")\n        \n        # Run initialization in background\n        threading.Thread(target=init_services, daemon=True).start()\n    \n    def toggle_recording(self):\n        \"\"\"Toggle audio recording\"\"\"\n        if not self.speech_service or not self.speech_service.is_available():\n            messagebox.showerror(\"Error\", \"Speech service not available\")\n            return\n        \n        if not self.is_recording:\n            self.start_recording()\n        else:\n            self.stop_recording()\n    \n    def start_recording(self):\n        \"\"\"Start audio recording\"\"\"\n        try:\n            self.is_recording = True\n            self.record_button.configure(text=\"🛑 Stop Recording\", style='Stop.TButton')\n            self.transcription_var.set(\"🎤 Recording... Speak now!\")\n            \n            # Start recording with audio level callback\n            self.speech_service.start_recording(callback=self.update_audio_level)\n            \n            self.update_status(\"Recording audio...\")\n            logger.info(\"Started recording\")\n            \n        except Exception as e:\n            self.is_recording = False\n            self.record_button.configure(text=\"🎤 Start Recording\", style='Record.TButton')\n            self.update_status(f\"Recording failed: {e}\")\n            messagebox.showerror(\"Recording Error\", f\"Failed to start recording: {e}\")\n    \n    def stop_recording(self):\n        \"\"\"Stop audio recording and process\"\"\"\n        if not self.is_recording:\n            return\n        \n        def process_recording():\n            try:\n                self.update_status(\"Processing audio...\")\n                self.transcription_var.set(\"🔄 Processing audio...\")\n                \n                # Stop recording and get transcription\n                transcript = self.speech_service.stop_recording_and_transcribe()\n                \n                if transcript:\n                    self.transcription_var.set(f\"📝 Transcribed: {transcript}\")\n                    self.add_to_conversation(\"You\", transcript)\n                    \n                    # Get AI response\n                    self.get_ai_response(transcript)\n                else:\n                    self.transcription_var.set(\"❌ No speech detected\")\n                    self.update_status(\"No speech detected\")\n                \n            except Exception as e:\n                logger.error(f\"Recording processing failed: {e}\")\n                self.transcription_var.set(f\"❌ Error: {e}\")\n                self.update_status(f\"Processing failed: {e}\")\n            finally:\n                self.is_recording = False\n                self.record_button.configure(text=\"🎤 Start Recording\", style='Record.TButton')\n                self.audio_level_var.set(0)\n        \n        # Process in background thread\n        threading.Thread(target=process_recording, daemon=True).start()\n    \n    def update_audio_level(self, level):\n        \"\"\"Update audio level indicator\"\"\"\n        self.audio_level_var.set(level)\n    \n    def get_ai_response(self, user_input):\n        \"\"\"Get AI response and play it\"\"\"\n        if not self.ai_service or not self.ai_service.is_available:\n            self.add_to_conversation(\"System\", \"AI service not available\")\n            return\n        \n        def process_ai_response():\n            try:\n                self.update_status(\"Getting AI response...\")\n                \n                # Get AI response\n                ai_response = self.ai_service.get_response(user_input)\n                \n                if ai_response:\n                    self.add_to_conversation(\"AI Tutor\", ai_response)\n                    \n                    # Convert to speech and play\n                    if self.speech_service and self.speech_service.is_available():\n                        self.update_status(\"Converting to speech...\")\n                        success = self.speech_service.text_to_speech(ai_response)\n                        if success:\n                            self.update_status(\"Playing AI response\")\n                        else:\n                            self.update_status(\"TTS failed\")\n                    else:\n                        self.update_status(\"TTS not available\")\n                else:\n                    self.add_to_conversation(\"System\", \"Failed to get AI response\")\n                    self.update_status(\"AI response failed\")\n                \n            except Exception as e:\n                logger.error(f\"AI response failed: {e}\")\n                self.add_to_conversation(\"System\", f\"AI Error: {e}\")\n                self.update_status(f\"AI error: {e}\")\n        \n        # Process in background thread\n        threading.Thread(target=process_ai_response, daemon=True).start()\n    \n    def send_text_message(self, event=None):\n        \"\"\"Send text message from entry widget\"\"\"\n        message = self.message_entry.get().strip()\n        if not message:\n            return\n        \n        self.message_entry.delete(0, tk.END)\n        self.add_to_conversation(\"You\", message)\n        self.get_ai_response(message)\n    \n    def add_to_conversation(self, speaker, message):\n        \"\"\"Add message to conversation display\"\"\"\n        timestamp = datetime.now().strftime(\"%H:%M\")\n        \n        self.conversation_text.configure(state=tk.NORMAL)\n        \n        # Add speaker and timestamp\n        if speaker == \"You\":\n            tag = \"user\"\n            prefix = f\"[{timestamp}] 🙋 You: \"\n        elif speaker == \"AI Tutor\":\n            tag = \"ai\"\n            prefix = f\"[{timestamp}] 🤖 AI Tutor: \"\n        else:\n            tag = \"system\"\n            prefix = f\"[{timestamp}] ℹ️ {speaker}: \"\n        \n        self.conversation_text.insert(tk.END, prefix, tag + \"_prefix\")\n        self.conversation_text.insert(tk.END, message + \"\\n\\n\", tag)\n        \n        # Configure tags for different speakers\n        self.conversation_text.tag_configure(\"user_prefix\", foreground=\"#2E8B57\", font=UIConfig.FONTS['default'])\n        self.conversation_text.tag_configure(\"user\", foreground=\"#2E8B57\")\n        \n        self.conversation_text.tag_configure(\"ai_prefix\", foreground=\"#4169E1\", font=UIConfig.FONTS['default'])\n        self.conversation_text.tag_configure(\"ai\", foreground=\"#4169E1\")\n        \n        self.conversation_text.tag_configure(\"system_prefix\", foreground=\"#888888\", font=UIConfig.FONTS['default'])\n        self.conversation_text.tag_configure(\"system\", foreground=\"#888888\")\n        \n        self.conversation_text.configure(state=tk.DISABLED)\n        self.conversation_text.see(tk.END)\n    \n    def start_topic_conversation(self):\n        \"\"\"Start conversation with selected topic\"\"\"\n        topic = self.topic_var.get()\n        starter = ConversationTopics.get_random_starter(topic)\n        \n        self.add_to_conversation(\"AI Tutor\", starter)\n        \n        # Play the starter if TTS is available\n        if self.speech_service and self.speech_service.is_available():\n            threading.Thread(target=lambda: self.speech_service.text_to_speech(starter), \n                           daemon=True).start()\n    \n    def clear_conversation(self):\n        \"\"\"Clear conversation history\"\"\"\n        if messagebox.askyesno(\"Clear Conversation\", \"Are you sure you want to clear the conversation?\"):\n            self.conversation_text.configure(state=tk.NORMAL)\n            self.conversation_text.delete(1.0, tk.END)\n            self.conversation_text.configure(state=tk.DISABLED)\n            \n            if self.ai_service:\n                self.ai_service.clear_conversation()\n            \n            self.update_status(\"Conversation cleared\")\n    \n    def save_conversation(self):\n        \"\"\"Save conversation to file\"\"\"\n        if not self.ai_service:\n            messagebox.showerror(\"Error\", \"No conversation to save\")\n            return\n        \n        filename = filedialog.asksaveasfilename(\n            defaultextension=\".json\",\n            filetypes=[(\"JSON files\", \"*.json\"), (\"All files\", \"*.*\")],\n            title=\"Save Conversation\"\n        )\n        \n        if filename:\n            try:\n                saved_path = self.ai_service.save_conversation(filename)\n                if saved_path:\n                    self.update_status(f\"Conversation saved to {saved_path}\")\n                    messagebox.showinfo(\"Success\", f\"Conversation saved to:\\n{saved_path}\")\n                else:\n                    messagebox.showerror(\"Error\", \"Failed to save conversation\")\n            except Exception as e:\n                messagebox.showerror(\"Error\", f\"Failed to save conversation: {e}\")\n    \n    def load_conversation(self):\n        \"\"\"Load conversation from file\"\"\"\n        filename = filedialog.askopenfilename(\n            filetypes=[(\"JSON files\", \"*.json\"), (\"All files\", \"*.*\")],\n            title=\"Load Conversation\"\n        )\n        \n        if filename and self.ai_service:\n            try:\n                if self.ai_service.load_conversation(filename):\n                    # Refresh conversation display\n                    self.refresh_conversation_display()\n                    self.update_status(f\"Conversation loaded from {filename}\")\n                    messagebox.showinfo(\"Success\", \"Conversation loaded successfully\")\n                else:\n                    messagebox.showerror(\"Error\", \"Failed to load conversation\")\n            except Exception as e:\n                messagebox.showerror(\"Error\", f\"Failed to load conversation: {e}\")\n    \n    def refresh_conversation_display(self):\n        \"\"\"Refresh conversation display from loaded history\"\"\"\n        if not self.ai_service:\n            return\n        \n        history = self.ai_service.get_conversation_history()\n        \n        # Clear current display\n        self.conversation_text.configure(state=tk.NORMAL)\n        self.conversation_text.delete(1.0, tk.END)\n        \n        # Add messages from history\n        for msg in history.messages:\n            if msg[\"role\"] == \"user\":\n                self.add_to_conversation(\"You\", msg[\"content\"])\n            elif msg[\"role\"] == \"assistant\":\n                self.add_to_conversation(\"AI Tutor\", msg[\"content\"])\n        \n        self.conversation_text.configure(state=tk.DISABLED)\n    \n    def change_ai_provider(self):\n        \"\"\"Change AI provider\"\"\"\n        new_provider = self.ai_provider_var.get()\n        \n        def switch_provider():\n            try:\n                self.update_status(f\"Switching to {new_provider}...\")\n                Config.AI_PROVIDER = new_provider\n                \n                # Reinitialize AI service\n                self.ai_service = AITutorService()\n                \n                if self.ai_service.is_available:\n                    self.ai_status_var.set(f\"AI: ✅ {self.ai_service.provider.title()}\")\n                    self.update_status(f\"Switched to {new_provider}\")\n                else:\n                    self.ai_status_var.set(\"AI: ❌ Not available\")\n                    self.update_status(f\"Failed to switch to {new_provider}\")\n                    \n            except Exception as e:\n                self.ai_status_var.set(\"AI: ❌ Error\")\n                self.update_status(f\"Provider switch failed: {e}\")\n        \n        threading.Thread(target=switch_provider, daemon=True).start()\n    \n    def toggle_offline_mode(self):\n        \"\"\"Toggle offline mode\"\"\"\n        Config.OFFLINE_MODE = self.offline_mode_var.get()\n        \n        # Reinitialize services with new mode\n        self.setup_services()\n    \n    def test_tts(self):\n        \"\"\"Test text-to-speech\"\"\"\n        if self.speech_service and self.speech_service.is_available():\n            test_text = \"Hello! This is a test of the text to speech system. How does it sound?\"\n            threading.Thread(target=lambda: self.speech_service.text_to_speech(test_text), \n                           daemon=True).start()\n            self.update_status(\"Testing TTS...\")\n        else:\n            messagebox.showerror(\"Error\", \"Speech service not available\")\n    \n    def test_recording(self):\n        \"\"\"Test audio recording\"\"\"\n        if not self.speech_service or not self.speech_service.is_available():\n            messagebox.showerror(\"Error\", \"Speech service not available\")\n            return\n        \n        if self.is_recording:\n            messagebox.showwarning(\"Warning\", \"Already recording. Stop current recording first.\")\n            return\n        \n        # Start a 3-second test recording\n        def test_record():\n            try:\n                self.update_status(\"Test recording for 3 seconds...\")\n                self.speech_service.start_recording()\n                time.sleep(3)\n                transcript = self.speech_service.stop_recording_and_transcribe()\n                \n                if transcript:\n                    messagebox.showinfo(\"Test Result\", f\"Recording successful!\\nTranscribed: {transcript}\")\n                else:\n                    messagebox.showwarning(\"Test Result\", \"No speech detected in test recording\")\n                \n                self.update_status(\"Test recording completed\")\n                \n            except Exception as e:\n                messagebox.showerror(\"Test Failed\", f\"Recording test failed: {e}\")\n                self.update_status(\"Test recording failed\")\n        \n        threading.Thread(target=test_record, daemon=True).start()\n    \n    def update_stats(self):\n        \"\"\"Update statistics display\"\"\"\n        if self.ai_service:\n            stats = self.ai_service.get_stats()\n            self.messages_count_var.set(f\"Messages: {stats.get('total_messages', 0)}\")\n            self.tokens_var.set(f\"Tokens: {stats.get('total_tokens', 0)}\")\n        \n        # Schedule next update\n        self.root.after(5000, self.update_stats)  # Update every 5 seconds\n    \n    def update_session_time(self):\n        \"\"\"Update session time display\"\"\"\n        if self.ai_service:\n            stats = self.ai_service.get_stats()\n            duration = stats.get('session_duration', 0)\n            \n            minutes = int(duration // 60)\n            seconds = int(duration % 60)\n            self.session_time_var.set(f\"Duration: {minutes}:{seconds:02d}\")\n        \n        # Schedule next update\n        self.root.after(1000, self.update_session_time)  # Update every second\n    \n    def update_status(self, message):\n        \"\"\"Update status message\"\"\"\n        self.status_var.set(message)\n        logger.info(f\"Status: {message}\")\n    \n    def on_closing(self):\n        \"\"\"Handle application closing\"\"\"\n        try:\n            # Stop any ongoing recording\n            if self.is_recording:\n                self.stop_recording()\n            \n            # Cleanup services\n            if self.speech_service:\n                self.speech_service.cleanup()\n            \n            # Save current conversation if there are messages\n            if self.ai_service:\n                stats = self.ai_service.get_stats()\n                if stats.get('total_messages', 0) > 0:\n                    if messagebox.askyesno(\"Save Conversation\", \n                                         \"Would you like to save the current conversation?\"):\n                        timestamp = datetime.now().strftime(\"%Y%m%d_%H%M%S\")\n                        filename = f\"conversation_{timestamp}.json\"\n                        self.ai_service.save_conversation(filename)\n            \n            logger.info(\"Application closing\")\n            \n        except Exception as e:\n            logger.error(f\"Error during cleanup: {e}\")\n        finally:\n            self.root.destroy()\n    \n    def run(self):\n        \"\"\"Start the application\"\"\"\n        try:\n            self.root.mainloop()\n        except KeyboardInterrupt:\n            logger.info(\"Application interrupted\")\n        except Exception as e:\n            logger.error(f\"Application error: {e}\")\n            messagebox.showerror(\"Application Error\", f\"An error occurred: {e}\")\n\ndef main():\n    \"\"\"Main application entry point\"\"\"\n    try:\n        app = ConversationApp()\n        app.run()\n    except Exception as e:\n        print(f\"Failed to start application: {e}\")\n        if tk:\n            messagebox.showerror(\"Startup Error\", f\"Failed to start application: {e}\")\n\nif __name__ == \"__main__\":\n    main()
\ No newline at end of file
+                                       font=self._font_default)
+        transcription_label.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=2)
+    
+    def create_info_panel(self, parent):
+        """Create the information panel"""
+        info_frame = ttk.LabelFrame(parent, text="📊 Information", padding="10")
+        info_frame.grid(row=1, column=2, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(5, 0))
+        
+        # Service status
+        ttk.Label(info_frame, text="🔧 Service Status:", 
+                 font=self._font_heading).pack(anchor=tk.W, pady=(0, 5))
+        
+        self.speech_status_var = tk.StringVar(value="Speech: Checking...")
+        ttk.Label(info_frame, textvariable=self.speech_status_var).pack(anchor=tk.W)
+        
+        self.ai_status_var = tk.StringVar(value="AI: Checking...")
+        ttk.Label(info_frame, textvariable=self.ai_status_var).pack(anchor=tk.W)
+        
+        # Statistics
+        ttk.Label(info_frame, text="📈 Session Stats:", 
+                 font=self._font_heading).pack(anchor=tk.W, pady=(15, 5))
+        
+        self.messages_count_var = tk.StringVar(value="Messages: 0")
+        ttk.Label(info_frame, textvariable=self.messages_count_var).pack(anchor=tk.W)
+        
+        self.session_time_var = tk.StringVar(value="Duration: 0:00")
+        ttk.Label(info_frame, textvariable=self.session_time_var).pack(anchor=tk.W)
+        
+        self.tokens_var = tk.StringVar(value="Tokens: 0")
+        ttk.Label(info_frame, textvariable=self.tokens_var).pack(anchor=tk.W)
+        
+        # Settings, built the first time they are expanded
+        self.ai_provider_var = tk.StringVar(value=Config.AI_PROVIDER)
+        self.offline_mode_var = tk.BooleanVar(value=Config.OFFLINE_MODE)
+        self.tts_speed_var = tk.DoubleVar(value=Config.TTS_SPEED)
+        
+        self._settings_frame = None
+        self._settings_button = ttk.Button(info_frame, text="⚙️ Settings ▸",
+                                           command=self.toggle_settings)
+        self._settings_button.pack(fill=tk.X, pady=(15, 5))
+        self._info_frame = info_frame
+    
+    def toggle_settings(self):
+        """Show or hide the settings, creating their widgets on first use"""
+        if self._settings_frame is None:
+            self._settings_frame = ttk.Frame(self._info_frame)
+            self._build_settings(self._settings_frame)
+        elif self._settings_frame.winfo_ismapped():
+            self._settings_frame.pack_forget()
+            self._settings_button.configure(text="⚙️ Settings ▸")
+            return
+        
+        self._settings_frame.pack(fill=tk.X)
+        self._settings_button.configure(text="⚙️ Settings ▾")
+    
+    def _build_settings(self, parent):
+        """Create the settings widgets"""
+        # AI Provider selection
+        ttk.Label(parent, text="AI Provider:").pack(anchor=tk.W)
+        provider_frame = ttk.Frame(parent)
+        provider_frame.pack(fill=tk.X, pady=2)
+        
+        ttk.Radiobutton(provider_frame, text="OpenAI", variable=self.ai_provider_var,
+                       value="openai", command=self.change_ai_provider).pack(anchor=tk.W)
+        ttk.Radiobutton(provider_frame, text="Ollama", variable=self.ai_provider_var,
+                       value="ollama", command=self.change_ai_provider).pack(anchor=tk.W)
+        
+        # Offline mode toggle
+        ttk.Checkbutton(parent, text="Offline Mode (Whisper)",
+                       variable=self.offline_mode_var,
+                       command=self.toggle_offline_mode).pack(anchor=tk.W, pady=5)
+        
+        # TTS Speed control
+        ttk.Label(parent, text="Speech Speed:").pack(anchor=tk.W, pady=(10, 2))
+        speed_scale = ttk.Scale(parent, from_=0.5, to=2.0, 
+                               variable=self.tts_speed_var, orient=tk.HORIZONTAL)
+        speed_scale.pack(fill=tk.X)
+        
+        # Test buttons
+        ttk.Button(parent, text="🔊 Test TTS",
+                  command=self.test_tts).pack(fill=tk.X, pady=(10, 2))
+        
+        ttk.Button(parent, text="🎤 Test Recording",
+                  command=self.test_recording).pack(fill=tk.X, pady=2)
+    
+    def create_status_panel(self, parent):
+        """Create the status panel"""
+        status_frame = ttk.Frame(parent)
+        status_frame.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(10, 0))
+        status_frame.columnconfigure(0, weight=1)
+        
+        self.status_var = tk.StringVar(value="Initializing...")
+        status_label = ttk.Label(status_frame, textvariable=self.status_var,
+                                style='Status.TLabel')
+        status_label.grid(row=0, column=0, sticky=tk.W)
+        
+        # Progress bar for loading operations
+        self.progress_var = tk.DoubleVar()
+        self.progress_bar = ttk.Progressbar(status_frame, variable=self.progress_var,
+                                          mode='indeterminate')
+        self.progress_bar.grid(row=0, column=1, sticky=tk.E, padx=(10, 0))
+    
+    def setup_events(self):
+        """Setup event handlers"""
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        # Start periodic updates
+        self._var_values = {}
+        self._tick()
+    
+    def setup_services(self):
+        """Initialize speech and AI services"""
+        def init_services():
+            self.root.after(0, self.progress_bar.start)
+            self.update_status("Initializing speech services and AI tutor...")
+            
+            # Speech and AI setup are independent, so run them side by side
+            errors = []
+            
+            def run(init):
+                try:
+                    init()
+                except Exception as e:
+                    logger.error("Service initialization failed: %s", e)
+                    errors.append(e)
+            
+            threads = [threading.Thread(target=run, args=(init,), daemon=True)
+                       for init in (self._init_speech_service, self._init_ai_service)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            
+            self.root.after(0, self._services_ready, errors)
+        
+        # Run initialization in background
+        threading.Thread(target=init_services, daemon=True).start()
+    
+    def _services_ready(self, errors):
+        """Finish service initialization on the Tk thread"""
+        self.progress_bar.stop()
+        if errors:
+            self.update_status(f"Service error: {errors[0]}")
+            messagebox.showerror("Service Error", f"Failed to initialize services: {errors[0]}")
+        else:
+            self.update_status("All services ready!")
+    
+    def _init_speech_service(self):
+        """Create the speech service and show its status"""
+        self.speech_service = SpeechService()
+        self._speech_ok = self.speech_service.is_available()
+        
+        if self._speech_ok:
+            self.root.after(0, self.speech_status_var.set, "Speech: ✅ Ready")
+            logger.info("Speech service initialized successfully")
+        else:
+            self.root.after(0, self.speech_status_var.set, "Speech: ❌ Not available")
+            logger.warning("Speech service not available")
+    
+    def _init_ai_service(self):
+        """Create the AI tutor service and show its status"""
+        self.ai_service = AITutorService()
+        self._watch_ai_service(self.ai_service)
+        
+        if self.ai_service.is_available:
+            self.root.after(0, self.ai_status_var.set, f"AI: ✅ {self.ai_service.provider.title()}")
+            logger.info("AI service initialized successfully")
+        else:
+            self.root.after(0, self.ai_status_var.set, "AI: ❌ Not available")
+            logger.warning("AI service not available")
+    
+    def _reinit_speech_service(self):
+        """Recreate only the speech service, e.g. after the offline mode changed"""
+        def reinit():
+            try:
+                self.update_status("Reinitializing speech services...")
+                old_service = self.speech_service
+                self._speech_ok = False
+                self._init_speech_service()
+                if old_service:
+                    old_service.cleanup()
+                self.update_status("Speech services ready!")
+            except Exception as e:
+                logger.error("Speech service reinitialization failed: %s", e)
+                self.root.after(0, self.speech_status_var.set, "Speech: ❌ Error")
+                self.update_status(f"Speech service error: {e}")
+        
+        threading.Thread(target=reinit, daemon=True).start()
+    
+    def toggle_recording(self):
+        """Toggle audio recording"""
+        if not self._speech_ok:
+            messagebox.showerror("Error", "Speech service not available")
+            return
+        
+        if not self.is_recording:
+            self.start_recording()
+        else:
+            self.stop_recording()
+    
+    def start_recording(self):
+        """Start audio recording"""
+        try:
+            self.is_recording = True
+            self.record_button.configure(text="🛑 Stop Recording", style='Stop.TButton')
+            self.transcription_var.set("🎤 Recording... Speak now!")
+            
+            # Start recording with audio level callback
+            self.speech_service.start_recording(callback=self.update_audio_level)
+            
+            self.update_status("Recording audio...")
+            logger.info("Started recording")
+            
+        except Exception as e:
+            self.is_recording = False
+            self.record_button.configure(text="🎤 Start Recording", style='Record.TButton')
+            self.update_status(f"Recording failed: {e}")
+            messagebox.showerror("Recording Error", f"Failed to start recording: {e}")
+    
+    def stop_recording(self):
+        """Stop audio recording and process"""
+        if not self.is_recording:
+            return
+        
+        def process_recording():
+            try:
+                self.update_status("Processing audio...")
+                self.root.after(0, self.transcription_var.set, "🔄 Processing audio...")
+                
+                # Stop recording and get transcription
+                transcript = self.speech_service.stop_recording_and_transcribe()
+                
+                if transcript:
+                    self.root.after(0, self.transcription_var.set, f"📝 Transcribed: {transcript}")
+                    self.add_to_conversation("You", transcript)
+                    
+                    # Get AI response
+                    self.get_ai_response(transcript)
+                else:
+                    self.root.after(0, self.transcription_var.set, "❌ No speech detected")
+                    self.update_status("No speech detected")
+                
+            except Exception as e:
+                logger.error("Recording processing failed: %s", e)
+                self.root.after(0, self.transcription_var.set, f"❌ Error: {e}")
+                self.update_status(f"Processing failed: {e}")
+            finally:
+                self.is_recording = False
+                self._pending_level = 0.0
+                self.root.after(0, self._recording_finished)
+        
+        # Process in background thread
+        threading.Thread(target=process_recording, daemon=True).start()
+    
+    def _recording_finished(self):
+        """Reset the record button and level meter on the Tk thread"""
+        self.record_button.configure(text="🎤 Start Recording", style='Record.TButton')
+        self.audio_level_var.set(0)
+    
+    def update_audio_level(self, level):
+        """Update audio level indicator (called from the audio thread)"""
+        # Keep only the latest level and redraw at most ~30 times per second
+        self._pending_level = level
+        if not self._level_scheduled:
+            self._level_scheduled = True
+            self.root.after(33, self._flush_level)
+    
+    def _flush_level(self):
+        """Show the latest audio level on the Tk thread"""
+        self._level_scheduled = False
+        self.audio_level_var.set(self._pending_level)
+    
+    def get_ai_response(self, user_input):
+        """Get AI response and play it"""
+        if not self.ai_service or not self.ai_service.is_available:
+            self.add_to_conversation("System", "AI service not available")
+            return
+        
+        def process_ai_response():
+            try:
+                self.update_status("Getting AI response...")
+                
+                # Get AI response
+                ai_response = self.ai_service.get_response(user_input)
+                
+                if ai_response:
+                    self.add_to_conversation("AI Tutor", ai_response)
+                    
+                    # Convert to speech and play
+                    if self._speech_ok:
+                        self.update_status("Converting to speech...")
+                        success = self.speech_service.text_to_speech(ai_response)
+                        if success:
+                            self.update_status("Playing AI response")
+                        else:
+                            self.update_status("TTS failed")
+                    else:
+                        self.update_status("TTS not available")
+                else:
+                    self.add_to_conversation("System", "Failed to get AI response")
+                    self.update_status("AI response failed")
+                
+            except Exception as e:
+                logger.error("AI response failed: %s", e)
+                self.add_to_conversation("System", f"AI Error: {e}")
+                self.update_status(f"AI error: {e}")
+        
+        # Process in background thread
+        threading.Thread(target=process_ai_response, daemon=True).start()
+    
+    def send_text_message(self, event=None):
+        """Send text message from entry widget"""
+        message = self.message_entry.get().strip()
+        if not message:
+            return
+        
+        self.message_entry.delete(0, tk.END)
+        self.add_to_conversation("You", message)
+        self.get_ai_response(message)
+    
+    def add_to_conversation(self, speaker, message):
+        """Add message to conversation display (safe to call from worker threads)"""
+        if threading.current_thread() is not threading.main_thread():
+            self.root.after(0, self.add_to_conversation, speaker, message)
+            return
+        
+        timestamp = time.strftime("%H:%M")
+        if self._session_start is None and speaker in self._SPEAKER_META:
+            self._session_start = time.monotonic()
+        
+        # Only follow new messages when the user has not scrolled up
+        at_bottom = self.conversation_text.yview()[1] > 0.98
+        
+        # One insert command for both tagged runs
+        self.conversation_text.insert(tk.END, *self._message_runs(speaker, message, timestamp))
+        self._trim_conversation()
+        
+        if at_bottom:
+            self.conversation_text.see(tk.END)
+    
+    # The display keeps a rolling window of lines; the full history stays in the AI service
+    MAX_DISPLAY_LINES = 2000
+    TRIM_DISPLAY_LINES = 500
+    
+    def _trim_conversation(self):
+        """Drop the oldest lines once the display grows past MAX_DISPLAY_LINES"""
+        lines = int(self.conversation_text.index("end-1c").split(".")[0])
+        if lines > self.MAX_DISPLAY_LINES:
+            self.conversation_text.delete("1.0", f"{self.TRIM_DISPLAY_LINES + 1}.0")
+    
+    # Keys that only move the cursor or selection in the conversation view
+    _NAVIGATION_KEYS = frozenset(("Up", "Down", "Left", "Right", "Prior", "Next", "Home", "End"))
+    
+    def _block_edit_keys(self, event):
+        """Swallow key presses that would edit the conversation, keeping copy and navigation"""
+        if event.keysym in self._NAVIGATION_KEYS:
+            return None
+        if event.state & 0x4 and event.keysym.lower() in ("c", "a"):  # Ctrl+C / Ctrl+A
+            return None
+        return "break"
+    
+    # Speaker -> (body tag, prefix tag, label); other speakers are system messages
+    _SPEAKER_META = {
+        "You": ("user", "user_prefix", "🙋 You"),
+        "AI Tutor": ("ai", "ai_prefix", "🤖 AI Tutor"),
+    }
+    
+    @classmethod
+    def _message_runs(cls, speaker, message, timestamp):
+        """Text/tag pairs for one conversation entry, as accepted by Text.insert"""
+        meta = cls._SPEAKER_META.get(speaker)
+        if meta:
+            tag, prefix_tag, label = meta
+        else:
+            tag, prefix_tag, label = "system", "system_prefix", f"ℹ️ {speaker}"
+        
+        return (f"[{timestamp}] {label}: ", prefix_tag, message + "\n\n", tag)
+    
+    def start_topic_conversation(self):
+        """Start conversation with selected topic"""
+        topic = self.topic_var.get()
+        starter = ConversationTopics.get_random_starter(topic)
+        
+        self.add_to_conversation("AI Tutor", starter)
+        
+        # Play the starter if TTS is available
+        if self._speech_ok:
+            threading.Thread(target=lambda: self.speech_service.text_to_speech(starter), 
+                           daemon=True).start()
+    
+    def clear_conversation(self):
+        """Clear conversation history"""
+        if messagebox.askyesno("Clear Conversation", "Are you sure you want to clear the conversation?"):
+            self.conversation_text.delete(1.0, tk.END)
+            self._session_start = None
+            self._set_var(self.session_time_var, "Duration: 0:00")
+            
+            if self.ai_service:
+                self.ai_service.clear_conversation()
+            
+            self.update_status("Conversation cleared")
+    
+    def save_conversation(self):
+        """Save conversation to file"""
+        if not self.ai_service:
+            messagebox.showerror("Error", "No conversation to save")
+            return
+        
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            title="Save Conversation"
+        )
+        
+        if filename:
+            # Serialize and write off the Tk thread so large histories don't freeze the UI
+            self.update_status("Saving conversation...")
+            threading.Thread(target=self._do_save, args=(self.ai_service, filename),
+                             daemon=True).start()
+    
+    def _do_save(self, ai_service, filename):
+        """Save the conversation and report the result on the Tk thread"""
+        try:
+            saved_path = ai_service.save_conversation(filename)
+            if saved_path:
+                self.root.after(0, self.update_status, f"Conversation saved to {saved_path}")
+                self.root.after(0, messagebox.showinfo, "Success", f"Conversation saved to:\n{saved_path}")
+            else:
+                self.root.after(0, messagebox.showerror, "Error", "Failed to save conversation")
+        except Exception as e:
+            self.root.after(0, messagebox.showerror, "Error", f"Failed to save conversation: {e}")
+    
+    def load_conversation(self):
+        """Load conversation from file"""
+        filename = filedialog.askopenfilename(
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            title="Load Conversation"
+        )
+        
+        if filename and self.ai_service:
+            try:
+                if self.ai_service.load_conversation(filename):
+                    # Refresh conversation display
+                    self.refresh_conversation_display()
+                    # The loaded history starts a new session
+                    self._session_start = None
+                    self._set_var(self.session_time_var, "Duration: 0:00")
+                    self.update_status(f"Conversation loaded from {filename}")
+                    messagebox.showinfo("Success", "Conversation loaded successfully")
+                else:
+                    messagebox.showerror("Error", "Failed to load conversation")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to load conversation: {e}")
+    
+    def refresh_conversation_display(self):
+        """Refresh conversation display from loaded history"""
+        if not self.ai_service:
+            return
+        
+        history = self.ai_service.get_conversation_history()
+        
+        # Clear current display
+        self.conversation_text.delete(1.0, tk.END)
+        
+        # Add all messages from history with a single insert
+        speakers = {"user": "You", "assistant": "AI Tutor"}
+        runs = []
+        for msg in history.messages:
+            speaker = speakers.get(msg.role)
+            if speaker:
+                timestamp = time.strftime("%H:%M", time.localtime(msg.created_at))
+                runs.extend(self._message_runs(speaker, msg.content, timestamp))
+        if runs:
+            self.conversation_text.insert(tk.END, *runs)
+            lines = int(self.conversation_text.index("end-1c").split(".")[0])
+            if lines > self.MAX_DISPLAY_LINES:
+                self.conversation_text.delete("1.0", f"{lines - self.MAX_DISPLAY_LINES + 1}.0")
+        
+        self.conversation_text.see(tk.END)
+    
+    def _debounce(self, key, callback, delay=300):
+        """Run callback after delay ms, replacing a pending call with the same key"""
+        pending = self._debounced.get(key)
+        if pending:
+            self.root.after_cancel(pending)
+        
+        def fire():
+            self._debounced.pop(key, None)
+            callback()
+        
+        self._debounced[key] = self.root.after(delay, fire)
+    
+    def change_ai_provider(self):
+        """Change AI provider"""
+        # Rapid clicks only switch once, to the last selected provider
+        self._debounce("provider", self._do_provider_switch)
+    
+    def _do_provider_switch(self):
+        """Switch to the selected AI provider in the background"""
+        new_provider = self.ai_provider_var.get()
+        Config.AI_PROVIDER = new_provider
+        self._provider_generation += 1
+        generation = self._provider_generation
+        
+        def switch_provider():
+            try:
+                self.update_status(f"Switching to {new_provider}...")
+                
+                # Reinitialize AI service
+                service = AITutorService()
+                if generation != self._provider_generation:
+                    return  # A newer switch superseded this one
+                
+                self.ai_service = service
+                self._watch_ai_service(service)
+                
+                if service.is_available:
+                    self.root.after(0, self.ai_status_var.set, f"AI: ✅ {service.provider.title()}")
+                    self.update_status(f"Switched to {new_provider}")
+                else:
+                    self.root.after(0, self.ai_status_var.set, "AI: ❌ Not available")
+                    self.update_status(f"Failed to switch to {new_provider}")
+                    
+            except Exception as e:
+                self.root.after(0, self.ai_status_var.set, "AI: ❌ Error")
+                self.update_status(f"Provider switch failed: {e}")
+        
+        threading.Thread(target=switch_provider, daemon=True).start()
+    
+    def toggle_offline_mode(self):
+        """Toggle offline mode"""
+        self._debounce("offline_mode", self._apply_offline_mode)
+    
+    def _apply_offline_mode(self):
+        """Apply the selected offline mode"""
+        Config.OFFLINE_MODE = self.offline_mode_var.get()
+        
+        # Only the speech backend depends on offline mode
+        self._reinit_speech_service()
+    
+    def test_tts(self):
+        """Test text-to-speech"""
+        if self._speech_ok:
+            test_text = "Hello! This is a test of the text to speech system. How does it sound?"
+            threading.Thread(target=lambda: self.speech_service.text_to_speech(test_text), 
+                           daemon=True).start()
+            self.update_status("Testing TTS...")
+        else:
+            messagebox.showerror("Error", "Speech service not available")
+    
+    def test_recording(self):
+        """Test audio recording"""
+        if not self._speech_ok:
+            messagebox.showerror("Error", "Speech service not available")
+            return
+        
+        if self.is_recording:
+            messagebox.showwarning("Warning", "Already recording. Stop current recording first.")
+            return
+        
+        # Start a 3-second test recording
+        def test_record():
+            try:
+                self.update_status("Test recording for 3 seconds...")
+                self.speech_service.start_recording()
+                time.sleep(3)
+                transcript = self.speech_service.stop_recording_and_transcribe()
+                
+                if transcript:
+                    self.root.after(0, messagebox.showinfo, "Test Result", f"Recording successful!\nTranscribed: {transcript}")
+                else:
+                    self.root.after(0, messagebox.showwarning, "Test Result", "No speech detected in test recording")
+                
+                self.update_status("Test recording completed")
+                
+            except Exception as e:
+                self.root.after(0, messagebox.showerror, "Test Failed", f"Recording test failed: {e}")
+                self.update_status("Test recording failed")
+        
+        threading.Thread(target=test_record, daemon=True).start()
+    
+    def _tick(self):
+        """Update session time every second; statistics are pushed by the AI service"""
+        if self._session_start is not None:
+            duration = time.monotonic() - self._session_start
+            
+            minutes = int(duration // 60)
+            seconds = int(duration % 60)
+            self._set_var(self.session_time_var, f"Duration: {minutes}:{seconds:02d}")
+        
+        # Schedule next update
+        self.root.after(1000, self._tick)  # Update every second
+    
+    def _watch_ai_service(self, service):
+        """Have an AI service push its statistics to the Tk thread"""
+        service.on_update = lambda stats: self.root.after(0, self._apply_stats, stats)
+        self.root.after(0, self._apply_stats, service.get_stats())
+    
+    def _apply_stats(self, stats):
+        """Show message and token counts"""
+        self._set_var(self.messages_count_var, f"Messages: {stats.get('total_messages', 0)}")
+        self._set_var(self.tokens_var, f"Tokens: {stats.get('total_tokens', 0)}")
+    
+    def _set_var(self, var, value):
+        """Set a Tk variable only when its value changes"""
+        name = str(var)
+        if self._var_values.get(name) != value:
+            self._var_values[name] = value
+            var.set(value)
+    
+    def update_status(self, message):
+        """Update status message (safe to call from worker threads)"""
+        if threading.current_thread() is not threading.main_thread():
+            self.root.after(0, self.update_status, message)
+            return
+        
+        self.status_var.set(message)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Status: %s", message)
+    
+    def on_closing(self):
+        """Handle application closing"""
+        try:
+            # Stop any ongoing recording
+            if self.is_recording:
+                self.stop_recording()
+            
+            # Cleanup services
+            if self.speech_service:
+                self.speech_service.cleanup()
+            
+            # Save current conversation if there are messages
+            if self.ai_service:
+                stats = self.ai_service.get_stats()
+                if stats.get('total_messages', 0) > 0:
+                    if messagebox.askyesno("Save Conversation", 
+                                         "Would you like to save the current conversation?"):
+                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                        filename = f"conversation_{timestamp}.json"
+                        self.ai_service.save_conversation(filename)
+            
+            logger.info("Application closing")
+            
+        except Exception as e:
+            logger.error("Error during cleanup: %s", e)
+        finally:
+            self.root.destroy()
+    
+    def run(self):
+        """Start the application"""
+        try:
+            self.root.mainloop()
+        except KeyboardInterrupt:
+            logger.info("Application interrupted")
+        except Exception as e:
+            logger.error("Application error: %s", e)
+            messagebox.showerror("Application Error", f"An error occurred: {e}")
+
+def main():
+    """Main application entry point"""
+    try:
+        app = ConversationApp()
+        app.run()
+    except Exception as e:
+        print(f"Failed to start application: {e}")
+        if tk:
+            messagebox.showerror("Startup Error", f"Failed to start application: {e}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
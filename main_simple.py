@@ -6,7 +6,7 @@ from tkinter import ttk, messagebox
 import threading
 import time
 import logging
-from datetime import datetime
+from collections import deque
 
 # Import our modules
 from config import Config, UIConfig, initialize_config
@@ -14,9 +14,38 @@ from ai_tutor import AITutorService
 
 logger = logging.getLogger(__name__)
 
+# Clock string for message timestamps, reformatted only when the minute changes
+_last_minute = None
+_last_minute_str = ""
+
+def _hhmm():
+    """Current local time as HH:MM"""
+    global _last_minute, _last_minute_str
+    minute = int(time.time() // 60)
+    if minute != _last_minute:
+        _last_minute_str = time.strftime("%H:%M")
+        _last_minute = minute
+    return _last_minute_str
+
 class SimpleConversationApp:
     """Simplified main application class"""
     
+    # Prefix and message tags per speaker, anyone else is shown as a system message
+    SPEAKER_TAGS = {
+        "You": ("user_prefix", "user"),
+        "AI Tutor": ("ai_prefix", "ai"),
+    }
+    
+    # Delay for coalescing bursts of messages into one display update (ms)
+    FLUSH_DELAY = 50
+    
+    # Delay for coalescing status changes, only the latest one is shown (ms)
+    STATUS_DELAY = 100
+    
+    # The display keeps a rolling window of lines; the full history stays in the AI service
+    MAX_DISPLAY_LINES = 2000
+    TRIM_DISPLAY_LINES = 500
+    
     def __init__(self):
         # Initialize configuration
         try:
@@ -28,6 +57,10 @@ class SimpleConversationApp:
         # Initialize AI service
         self.ai_service = None
         
+        # Messages and status waiting for the next display update
+        self._pending_messages = deque()
+        self._pending_status = None
+        
         # Initialize GUI
         self.root = tk.Tk()
         self.setup_gui()
@@ -65,6 +98,16 @@ class SimpleConversationApp:
         )
         self.conversation_text.pack(fill=tk.BOTH, expand=True)
         
+        # Configure colors
+        self.conversation_text.tag_configure("user_prefix", foreground="#2E8B57", font=('Arial', 10, 'bold'))
+        self.conversation_text.tag_configure("user", foreground="#2E8B57")
+        
+        self.conversation_text.tag_configure("ai_prefix", foreground="#4169E1", font=('Arial', 10, 'bold'))
+        self.conversation_text.tag_configure("ai", foreground="#4169E1")
+        
+        self.conversation_text.tag_configure("system_prefix", foreground="#888888", font=('Arial', 10, 'bold'))
+        self.conversation_text.tag_configure("system", foreground="#888888")
+        
         # Input area
         input_frame = ttk.Frame(conversation_frame)
         input_frame.pack(fill=tk.X, pady=(10, 0))
@@ -96,23 +139,27 @@ class SimpleConversationApp:
         status_label = ttk.Label(main_frame, textvariable=self.status_var)
         status_label.pack(pady=(10, 0))
     
+    def _ui(self, fn, *args):
+        """Run fn on the Tk main loop (Tk widgets must not be touched from worker threads)"""
+        self.root.after(0, lambda: fn(*args))
+    
     def setup_services(self):
         """Initialize AI service"""
         def init_ai():
             try:
-                self.update_status("Initializing AI tutor...")
+                self._ui(self.update_status, "Initializing AI tutor...")
                 self.ai_service = AITutorService()
                 
                 if self.ai_service.is_available:
-                    self.update_status("AI tutor ready!")
-                    self.add_to_conversation("System", "AI tutor is ready. Type a message to start chatting!")
+                    self._ui(self.update_status, "AI tutor ready!")
+                    self._ui(self.add_to_conversation, "System", "AI tutor is ready. Type a message to start chatting!")
                 else:
-                    self.update_status("AI tutor not available")
-                    self.add_to_conversation("System", "AI tutor is not available. Please check your configuration.")
+                    self._ui(self.update_status, "AI tutor not available")
+                    self._ui(self.add_to_conversation, "System", "AI tutor is not available. Please check your configuration.")
                     
             except Exception as e:
-                self.update_status(f"AI initialization failed: {e}")
-                self.add_to_conversation("System", f"Error: {e}")
+                self._ui(self.update_status, f"AI initialization failed: {e}")
+                self._ui(self.add_to_conversation, "System", f"Error: {e}")
         
         # Run in background
         threading.Thread(target=init_ai, daemon=True).start()
@@ -130,16 +177,16 @@ class SimpleConversationApp:
         if self.ai_service and self.ai_service.is_available:
             def get_response():
                 try:
-                    self.update_status("Getting AI response...")
+                    self._ui(self.update_status, "Getting AI response...")
                     response = self.ai_service.get_response(message)
                     if response:
-                        self.add_to_conversation("AI Tutor", response)
+                        self._ui(self.add_to_conversation, "AI Tutor", response)
                     else:
-                        self.add_to_conversation("System", "Failed to get AI response")
-                    self.update_status("Ready")
+                        self._ui(self.add_to_conversation, "System", "Failed to get AI response")
+                    self._ui(self.update_status, "Ready")
                 except Exception as e:
-                    self.add_to_conversation("System", f"AI Error: {e}")
-                    self.update_status("Ready")
+                    self._ui(self.add_to_conversation, "System", f"AI Error: {e}")
+                    self._ui(self.update_status, "Ready")
             
             threading.Thread(target=get_response, daemon=True).start()
     
@@ -153,6 +200,7 @@ class SimpleConversationApp:
         """Clear conversation"""
         if messagebox.askyesno("Clear", "Clear conversation?"):
             self.conversation_text.configure(state=tk.NORMAL)
+            self._pending_messages.clear()
             self.conversation_text.delete(1.0, tk.END)
             self.conversation_text.configure(state=tk.DISABLED)
             
@@ -160,42 +208,48 @@ class SimpleConversationApp:
                 self.ai_service.clear_conversation()
     
     def add_to_conversation(self, speaker, message):
-        """Add message to conversation"""
-        timestamp = datetime.now().strftime("%H:%M")
-        
-        self.conversation_text.configure(state=tk.NORMAL)
-        
-        if speaker == "You":
-            prefix = f"[{timestamp}] You: "
-            self.conversation_text.insert(tk.END, prefix, "user_prefix")
-            self.conversation_text.insert(tk.END, message + "\n\n", "user")
-        elif speaker == "AI Tutor":
-            prefix = f"[{timestamp}] AI Tutor: "
-            self.conversation_text.insert(tk.END, prefix, "ai_prefix")
-            self.conversation_text.insert(tk.END, message + "\n\n", "ai")
-        else:
-            prefix = f"[{timestamp}] {speaker}: "
-            self.conversation_text.insert(tk.END, prefix, "system_prefix")
-            self.conversation_text.insert(tk.END, message + "\n\n", "system")
+        """Add message to conversation (shown with the next display update)"""
+        timestamp = _hhmm()
+        prefix_tag, message_tag = self.SPEAKER_TAGS.get(speaker, ("system_prefix", "system"))
         
-        # Configure colors
-        self.conversation_text.tag_configure("user_prefix", foreground="#2E8B57", font=('Arial', 10, 'bold'))
-        self.conversation_text.tag_configure("user", foreground="#2E8B57")
+        # Only the first message of a burst schedules the update
+        if not self._pending_messages:
+            self.root.after(self.FLUSH_DELAY, self._flush_messages)
+        self._pending_messages.append(
+            (f"[{timestamp}] {speaker}: ", prefix_tag, message + "\n\n", message_tag)
+        )
+    
+    def _flush_messages(self):
+        """Insert all pending messages in one display update"""
+        chunks = []
+        while self._pending_messages:
+            chunks.extend(self._pending_messages.popleft())
+        if not chunks:
+            return
         
-        self.conversation_text.tag_configure("ai_prefix", foreground="#4169E1", font=('Arial', 10, 'bold'))
-        self.conversation_text.tag_configure("ai", foreground="#4169E1")
+        self.conversation_text.configure(state=tk.NORMAL)
+        self.conversation_text.insert(tk.END, *chunks)
         
-        self.conversation_text.tag_configure("system_prefix", foreground="#888888", font=('Arial', 10, 'bold'))
-        self.conversation_text.tag_configure("system", foreground="#888888")
+        # Drop the oldest lines once the display grows past MAX_DISPLAY_LINES
+        lines = int(self.conversation_text.index("end-1c").split(".")[0])
+        if lines > self.MAX_DISPLAY_LINES:
+            self.conversation_text.delete("1.0", f"{lines - self.MAX_DISPLAY_LINES + self.TRIM_DISPLAY_LINES}.0")
         
         self.conversation_text.configure(state=tk.DISABLED)
         self.conversation_text.see(tk.END)
     
     def update_status(self, message):
-        """Update status"""
-        self.status_var.set(message)
+        """Update status (shown with the next status refresh)"""
+        if self._pending_status is None:
+            self.root.after(self.STATUS_DELAY, self._flush_status)
+        self._pending_status = message
         print(f"Status: {message}")
     
+    def _flush_status(self):
+        """Show the latest pending status"""
+        self.status_var.set(self._pending_status)
+        self._pending_status = None
+    
     def run(self):
         """Start the application"""
         try:
@@ -2,17 +2,38 @@
 Flask Web Application for English Conversation Practice
 """
 import os
+
+# Green the standard library before anything else imports socket, ssl or threading,
+# so blocking provider calls yield to other clients instead of stalling the server
+ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'eventlet')
+if ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
 import json
+import hashlib
 import logging
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from flask import Flask, render_template, request, jsonify, session
+from flask.json.provider import DefaultJSONProvider
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 import uuid
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Import our modules
 from config import Config, initialize_config
-from ai_tutor import AITutorService, ConversationTopics
+from ai_tutor import AITutorService, ConversationTopics, ResponseCache
 
 # Initialize configuration
 try:
@@ -24,9 +45,48 @@ except Exception as e:
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
 
+# Reject oversized input before it reaches the AI provider
+MAX_REQUEST_SIZE = 16 * 1024
+MAX_MESSAGE_LENGTH = 2000
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_SIZE
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider for jsonify() and request.get_json() backed by orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+if ORJSON_AVAILABLE:
+    app.json = ORJSONProvider(app)
+
 # Enable CORS and SocketIO
-CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+ALLOWED_ORIGIN = os.environ.get('ALLOWED_ORIGIN')
+if not os.environ.get('RAILWAY_ENVIRONMENT') or not ALLOWED_ORIGIN:
+    # Development, or production without a known origin: any origin, as before
+    CORS(app, origins=ALLOWED_ORIGIN or '*')
+else:
+    # Production answers a single known origin, so its headers are fixed
+    _CORS_HEADERS = {
+        'Access-Control-Allow-Origin': ALLOWED_ORIGIN,
+        'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type',
+        'Vary': 'Origin'
+    }
+    
+    @app.after_request
+    def add_cors_headers(response):
+        """Add the fixed CORS headers (the health check is same-origin)"""
+        if request.path != '/health':
+            response.headers.update(_CORS_HEADERS)
+        return response
+
+# SOCKETIO_ASYNC_MODE picks the server: eventlet (default), gevent or threading
+socketio = SocketIO(app, cors_allowed_origins=ALLOWED_ORIGIN or "*",
+                    async_mode=ASYNC_MODE,
+                    max_http_buffer_size=MAX_REQUEST_SIZE)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -34,18 +94,83 @@ logger = logging.getLogger(__name__)
 
 # Global services
 ai_service = None
+response_cache = None
+ai_ready = threading.Event()  # Set once init_services() has finished
+AI_READY_TIMEOUT = 30  # Seconds a request waits for init_services() before giving up
+
+# Conversation saves run off the request thread; futures by filename for save-status.
+# This frees the request thread in threading mode only: under eventlet/gevent the pool's
+# workers are green threads, and the file write still blocks the hub while it runs.
+_save_executor = ThreadPoolExecutor(max_workers=2)
+_saves = {}
+_saves_lock = threading.Lock()  # Guards _saves across concurrent requests
+MAX_TRACKED_SAVES = 100  # Finished saves nobody asked about are forgotten beyond this
 
 def init_services():
     """Initialize AI service"""
-    global ai_service
+    global ai_service, response_cache
     try:
+        response_cache = ResponseCache()
         ai_service = AITutorService()
         if ai_service.is_available:
             logger.info(f"AI service initialized: {ai_service.provider}")
         else:
             logger.warning("AI service not available")
+        
+        # Open provider connections now rather than on the first user request
+        ai_service.warm_up()
     except Exception as e:
         logger.error(f"Failed to initialize AI service: {e}")
+    finally:
+        ai_ready.set()
+        # Clients that connected during startup were told the AI wasn't available yet
+        socketio.emit('status', service_status())
+
+def service_status():
+    """Status payload for SocketIO clients"""
+    return {
+        'connected': True,
+        'ai_available': ai_service.is_available if ai_service else False,
+        'ai_ready': ai_ready.is_set()
+    }
+
+# Initialize services while the server boots, also under gunicorn where __main__ doesn't run
+threading.Thread(target=init_services, daemon=True).start()
+
+def now_iso():
+    """Current UTC time as an ISO 8601 string with whole seconds"""
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+def session_scope():
+    """This browser session's id and topic; answers are never shared between sessions"""
+    session_id = session.setdefault('session_id', uuid.uuid4().hex)
+    return (session_id, session.get('topic', 'default'))
+
+def cache_lookup(user_message, hit):
+    """Build the lookup AITutorService calls within the turn, so cache hits are serialized like provider calls
+    
+    The context it is called with (session scope and the tutor's last message) and any
+    reused answer are stored in hit for cache_response.
+    """
+    def lookup(context):
+        hit['context'] = context
+        hit['response'] = response_cache.get(user_message, context) if response_cache else None
+        return hit['response']
+    return lookup
+
+def cache_response(user_message, ai_response, hit):
+    """Remember a fresh response for later near-identical prompts in the same context"""
+    if hit.get('response') is not None or 'context' not in hit:
+        return  # Reused from the cache, or shared from an identical request
+    if response_cache and ai_response and ai_response != AITutorService.DEFAULT_RESPONSE:
+        response_cache.put(user_message, ai_response, hit['context'])
+
+def get_ai_response(user_message):
+    """Get the tutor's response, reusing the answer to a near-identical earlier prompt"""
+    hit = {}
+    ai_response = ai_service.get_response(user_message, session_scope(), cache_lookup(user_message, hit))
+    cache_response(user_message, ai_response, hit)
+    return ai_response, hit.get('response') is not None
 
 @app.route('/')
 def index():
@@ -57,16 +182,23 @@ def health():
     """Health check endpoint for Railway"""
     return jsonify({
         'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
-        'ai_available': ai_service.is_available if ai_service else False
+        'timestamp': now_iso(),
+        'ai_available': ai_service.is_available if ai_service else False,
+        'ai_ready': ai_ready.is_set()
     })
 
+# The topics never change while the app runs, so they are serialized once
+_TOPICS_JSON = app.json.dumps({'topics': ConversationTopics.TOPICS})
+_TOPICS_ETAG = hashlib.md5(_TOPICS_JSON.encode()).hexdigest()
+
 @app.route('/api/topics')
 def get_topics():
     """Get available conversation topics"""
-    return jsonify({
-        'topics': ConversationTopics.TOPICS
-    })
+    response = app.response_class(_TOPICS_JSON, mimetype='application/json')
+    response.set_etag(_TOPICS_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response.make_conditional(request)
 
 @app.route('/api/start-topic', methods=['POST'])
 def start_topic():
@@ -76,6 +208,7 @@ def start_topic():
     
     try:
         starter = ConversationTopics.get_random_starter(topic)
+        session['topic'] = topic
         return jsonify({
             'success': True,
             'message': starter,
@@ -91,6 +224,8 @@ def start_topic():
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Handle chat messages"""
+    # Messages sent while the server is still starting wait for the AI service
+    ai_ready.wait(AI_READY_TIMEOUT)
     if not ai_service or not ai_service.is_available:
         return jsonify({
             'success': False,
@@ -106,9 +241,15 @@ def chat():
             'error': 'Empty message'
         }), 400
     
+    if len(user_message) > MAX_MESSAGE_LENGTH:
+        return jsonify({
+            'success': False,
+            'error': 'Message too long'
+        }), 413
+    
     try:
         # Get AI response
-        ai_response = ai_service.get_response(user_message)
+        ai_response, cached = get_ai_response(user_message)
         
         # Get conversation stats
         stats = ai_service.get_stats()
@@ -116,8 +257,9 @@ def chat():
         return jsonify({
             'success': True,
             'response': ai_response,
+            'cached': cached,
             'stats': stats,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso()
         })
         
     except Exception as e:
@@ -137,20 +279,26 @@ def save_conversation():
         }), 503
     
     try:
-        filename = f"conversation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        saved_path = ai_service.save_conversation(filename)
+        filename = f"conversation_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.json"
+        future = _save_executor.submit(ai_service.save_conversation, filename)
+        with _saves_lock:
+            _saves[filename] = future
+            
+            # Drop the oldest finished saves once too many are tracked
+            excess = len(_saves) - MAX_TRACKED_SAVES
+            for name, tracked in list(_saves.items()):
+                if excess <= 0:
+                    break
+                if tracked.done():
+                    del _saves[name]
+                    excess -= 1
         
-        if saved_path:
-            return jsonify({
-                'success': True,
-                'filename': filename,
-                'message': 'Conversation saved successfully'
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to save conversation'
-            }), 500
+        return jsonify({
+            'success': True,
+            'filename': filename,
+            'status': 'queued',
+            'message': 'Conversation is being saved'
+        }), 202
             
     except Exception as e:
         logger.error(f"Save conversation error: {e}")
@@ -159,6 +307,32 @@ def save_conversation():
             'error': str(e)
         }), 500
 
+@app.route('/api/conversation/save-status/<filename>')
+def save_status(filename):
+    """Report whether a queued conversation save has finished"""
+    with _saves_lock:
+        future = _saves.get(filename)
+        # Finished saves are reported once
+        if future is not None and future.done():
+            del _saves[filename]
+    if future is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown save'
+        }), 404
+    
+    if not future.done():
+        return jsonify({'success': True, 'filename': filename, 'status': 'queued'})
+    
+    if future.exception() is None and future.result():
+        return jsonify({'success': True, 'filename': filename, 'status': 'saved'})
+    return jsonify({
+        'success': False,
+        'filename': filename,
+        'status': 'failed',
+        'error': 'Failed to save conversation'
+    }), 500
+
 @app.route('/api/conversation/clear', methods=['POST'])
 def clear_conversation():
     """Clear current conversation"""
@@ -170,6 +344,8 @@ def clear_conversation():
     
     try:
         ai_service.clear_conversation()
+        if response_cache:
+            response_cache.clear()
         return jsonify({
             'success': True,
             'message': 'Conversation cleared successfully'
@@ -210,10 +386,7 @@ def get_stats():
 def handle_connect():
     """Handle client connection"""
     logger.info(f"Client connected: {request.sid}")
-    emit('status', {
-        'connected': True,
-        'ai_available': ai_service.is_available if ai_service else False
-    })
+    emit('status', service_status())
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -223,6 +396,8 @@ def handle_disconnect():
 @socketio.on('message')
 def handle_message(data):
     """Handle real-time chat messages"""
+    # Messages sent while the server is still starting wait for the AI service
+    ai_ready.wait(AI_READY_TIMEOUT)
     if not ai_service or not ai_service.is_available:
         emit('error', {'message': 'AI service not available'})
         return
@@ -232,19 +407,33 @@ def handle_message(data):
         emit('error', {'message': 'Empty message'})
         return
     
+    if len(user_message) > MAX_MESSAGE_LENGTH:
+        emit('error', {'message': 'Message too long'})
+        return
+    
     try:
-        # Get AI response
-        ai_response = ai_service.get_response(user_message)
+        # Stream the AI response to this client as it is generated
+        hit = {}
+        chunks = []
+        for chunk in ai_service.get_response_stream(user_message, session_scope(),
+                                                    cache_lookup(user_message, hit)):
+            chunks.append(chunk)
+            emit('token', {'delta': chunk})
+            socketio.sleep(0)  # Let other clients' events through between chunks
+        ai_response = "".join(chunks)
+        cached = hit.get('response') is not None
+        cache_response(user_message, ai_response, hit)
         
         # Get updated stats
         stats = ai_service.get_stats()
         
-        # Send response back to client
-        emit('response', {
+        # Finish the response with the full text and stats
+        emit('response_done', {
             'user_message': user_message,
             'ai_response': ai_response,
+            'cached': cached,
             'stats': stats,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso()
         })
         
     except Exception as e:
@@ -252,8 +441,7 @@ def handle_message(data):
         emit('error', {'message': 'Failed to get AI response'})
 
 if __name__ == '__main__':
-    # Initialize services
-    init_services()
+    # Services are initialized in the background at import
     
     # Get port from environment or default to 5000
     port = int(os.environ.get('PORT', 5000))